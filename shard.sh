@@ -0,0 +1,14 @@
+# builds the site as $1 shards (default 4), in parallel processes on this host,
+# then merges them into docs; further arguments are passed to every build
+shards="${1:-4}"
+shift
+pids=""
+for i in $(seq 1 "$shards"); do
+  python3 src/main.py --shard "$i/$shards" "$@" > /dev/null &
+  pids="$pids $!"
+done
+for pid in $pids; do
+  wait "$pid" || exit 1
+done
+dirs=$(seq -f "docs-shard-%g-of-$shards" 1 "$shards")
+python3 src/main.py "$@" --merge $dirs
@@ -0,0 +1,2 @@
+# Benchmarks for the static site generator. Run from the project root with
+# ./bench.sh, which puts src/ on the import path.
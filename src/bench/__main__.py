@@ -0,0 +1,127 @@
+import argparse
+import json
+import sys
+
+from bench.corpus import (
+    CorpusConfig,
+    generate_corpus,
+    load_content_pages,
+    parse_block_mix,
+)
+from bench.memory import measure_node_memory
+from bench.stages import run_stages, time_site_build
+from bench.startup import check_startup, measure_startup
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="static site generator benchmarks")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--blocks-per-page", type=int, default=40)
+    parser.add_argument("--paragraph-words", type=int, default=80)
+    parser.add_argument(
+        "--block-mix",
+        type=parse_block_mix,
+        default=None,
+        help="block weights, e.g. 'paragraph=6,heading=2,code=1'",
+    )
+    parser.add_argument("--link-density", type=float, default=0.02)
+    parser.add_argument("--image-density", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--content", default="content")
+    parser.add_argument("--template", default="template.html")
+    parser.add_argument(
+        "--startup-only",
+        action="store_true",
+        help="only measure CLI startup and import time",
+    )
+    parser.add_argument(
+        "--import-budget-ms",
+        type=float,
+        default=None,
+        help="fail when --version or importing main spends longer importing",
+    )
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument(
+        "--compare", help="print speedups relative to a previous JSON result file"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.startup_only:
+        results = {"startup": measure_startup(args.repeat)}
+    else:
+        results = run_all(args)
+    results_text = json.dumps(results, indent=2, sort_keys=True)
+    print(results_text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results_text + "\n")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(json.load(f), results)
+
+    problems = check_startup(results["startup"], args.import_budget_ms)
+    for problem in problems:
+        print(f"startup regression: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def run_all(args):
+    config = CorpusConfig(
+        pages=args.pages,
+        blocks_per_page=args.blocks_per_page,
+        paragraph_words=args.paragraph_words,
+        block_mix=args.block_mix,
+        link_density=args.link_density,
+        image_density=args.image_density,
+        seed=args.seed,
+    )
+    synthetic = generate_corpus(config)
+    content = load_content_pages(args.content)
+
+    results = {
+        "config": vars(config),
+        "synthetic": {
+            "stages": run_stages(synthetic, args.repeat),
+            "site_build": time_site_build(synthetic, args.template, args.jobs),
+        },
+        "content": {
+            "stages": run_stages(content, args.repeat),
+            "site_build": time_site_build(content, args.template, args.jobs),
+        },
+        "node_memory": measure_node_memory(args.nodes),
+        "startup": measure_startup(args.repeat),
+    }
+    return results
+
+
+# print_comparison() prints, per corpus and stage, how many times faster the
+# current run is than the baseline.
+def print_comparison(baseline, current):
+    for command, now in current["startup"].items():
+        before = baseline.get("startup", {}).get(command)
+        if before is not None:
+            speedup = before["seconds"] / max(now["seconds"], 1e-9)
+            print(f"{'startup':>9} {command:<22} {speedup:6.2f}x")
+    for corpus in ("synthetic", "content"):
+        if corpus not in current:
+            continue
+        for stage, now in current[corpus]["stages"].items():
+            before = baseline.get(corpus, {}).get("stages", {}).get(stage)
+            if before is None:
+                continue
+            speedup = now["ops_per_sec"] / max(before["ops_per_sec"], 1e-9)
+            print(f"{corpus:>9} {stage:<22} {speedup:6.2f}x")
+        before = baseline.get(corpus, {}).get("site_build")
+        if before is not None:
+            now = current[corpus]["site_build"]
+            speedup = before["seconds"] / max(now["seconds"], 1e-9)
+            print(f"{corpus:>9} {'site_build':<22} {speedup:6.2f}x")
+
+
+sys.exit(main())
@@ -0,0 +1,154 @@
+import os
+import random
+
+WORDS = (
+    "the of and to in is was that for on as with by at from his her elves "
+    "ring shire hobbit wizard mountain river forest journey council king "
+    "shadow light sword song ancient realm road tower gate star dragon "
+    "fellowship quest battle mithril lore valley harbour age"
+).split()
+
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 6,
+    "heading": 2,
+    "unordered_list": 1,
+    "ordered_list": 1,
+    "quote": 1,
+    "code": 1,
+}
+
+
+# CorpusConfig describes the shape of a synthetic corpus. Densities are the
+# probability, per word, of an inline element being inserted after it.
+class CorpusConfig:
+    def __init__(
+        self,
+        pages=50,
+        blocks_per_page=40,
+        paragraph_words=80,
+        list_items=5,
+        block_mix=None,
+        link_density=0.02,
+        image_density=0.005,
+        emphasis_density=0.03,
+        seed=0,
+    ):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.paragraph_words = paragraph_words
+        self.list_items = list_items
+        self.block_mix = block_mix or dict(DEFAULT_BLOCK_MIX)
+        self.link_density = link_density
+        self.image_density = image_density
+        self.emphasis_density = emphasis_density
+        self.seed = seed
+
+
+# parse_block_mix() parses a "paragraph=6,code=1" style mix specification.
+def parse_block_mix(spec):
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_BLOCK_MIX:
+            raise ValueError(f"unknown block type '{name}'")
+        mix[name] = int(weight)
+    return mix
+
+
+# generate_corpus() returns a list of markdown pages. The output only depends
+# on the config, so the same config always yields the same corpus.
+def generate_corpus(config):
+    rng = random.Random(config.seed)
+    return [generate_page(rng, config, i) for i in range(config.pages)]
+
+
+def generate_page(rng, config, page_number):
+    names = list(config.block_mix)
+    weights = [config.block_mix[name] for name in names]
+    blocks = [f"# Page {page_number}: {sentence(rng, config, 6, inline=False)}"]
+    for block_type in rng.choices(names, weights, k=config.blocks_per_page):
+        blocks.append(BLOCK_GENERATORS[block_type](rng, config))
+    return "\n\n".join(blocks) + "\n"
+
+
+def sentence(rng, config, words, inline=True):
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(WORDS))
+        if not inline:
+            continue
+        roll = rng.random()
+        if roll < config.link_density:
+            out.append(
+                f"[{rng.choice(WORDS)} {rng.choice(WORDS)}](/{rng.choice(WORDS)})"
+            )
+            continue
+        roll -= config.link_density
+        if roll < config.image_density:
+            out.append(f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)")
+            continue
+        roll -= config.image_density
+        if roll < config.emphasis_density:
+            delim = rng.choice(["**", "_", "`"])
+            out.append(f"{delim}{rng.choice(WORDS)}{delim}")
+    return " ".join(out)
+
+
+def paragraph(rng, config):
+    words = sentence(rng, config, config.paragraph_words).split(" ")
+    lines = [" ".join(words[i : i + 12]) for i in range(0, len(words), 12)]
+    return "\n".join(lines)
+
+
+def heading(rng, config):
+    return "#" * rng.randint(2, 4) + " " + sentence(rng, config, 5)
+
+
+def unordered_list(rng, config):
+    return "\n".join("- " + sentence(rng, config, 8) for _ in range(config.list_items))
+
+
+def ordered_list(rng, config):
+    return "\n".join(
+        f"{i}. " + sentence(rng, config, 8) for i in range(1, config.list_items + 1)
+    )
+
+
+def quote(rng, config):
+    return "\n".join("> " + sentence(rng, config, 10) for _ in range(3))
+
+
+def code(rng, config):
+    lines = [f"print({rng.choice(WORDS)!r})" for _ in range(6)]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+BLOCK_GENERATORS = {
+    "paragraph": paragraph,
+    "heading": heading,
+    "unordered_list": unordered_list,
+    "ordered_list": ordered_list,
+    "quote": quote,
+    "code": code,
+}
+
+
+# load_content_pages() returns the markdown of every page under content_dir.
+def load_content_pages(content_dir="content"):
+    pages = []
+    for dir_path, dir_names, file_names in os.walk(content_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            with open(os.path.join(dir_path, file_name), "r") as f:
+                pages.append(f.read())
+    return pages
+
+
+# write_corpus() lays the pages out as a content directory, one page per
+# sub-directory, as generate_pages_recursive expects.
+def write_corpus(pages, content_dir):
+    for i, page in enumerate(pages):
+        page_dir = os.path.join(content_dir, f"page{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), "w") as f:
+            f.write(page)
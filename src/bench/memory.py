@@ -0,0 +1,63 @@
+import sys
+import tracemalloc
+
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+
+# The dict-backed classes below mirror the node layout from before nodes used
+# __slots__, so that both layouts can be measured side by side.
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+NODE_FACTORIES = {
+    "TextNode": (
+        lambda text: TextNode(text, TextType.TEXT),
+        lambda text: DictTextNode(text, TextType.TEXT),
+    ),
+    "LeafNode": (
+        lambda text: LeafNode("b", text),
+        lambda text: DictHTMLNode("b", text, None, None),
+    ),
+    "ParentNode": (
+        lambda text: ParentNode("p", []),
+        lambda text: DictHTMLNode("p", None, [], None),
+    ),
+}
+
+
+# bytes_per_node() measures the memory allocated per node created by factory.
+# All nodes share one value string, so only the node itself (and, for
+# ParentNode, its empty children list) is counted.
+def bytes_per_node(factory, count=20000):
+    text = "shared node text"
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        nodes = [factory(text) for _ in range(count)]
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return (allocated - sys.getsizeof(nodes)) / count
+
+
+def measure_node_memory(count=20000):
+    results = {}
+    for name, (slotted, dict_backed) in NODE_FACTORIES.items():
+        results[name] = {
+            "slots_bytes": round(bytes_per_node(slotted, count), 1),
+            "dict_bytes": round(bytes_per_node(dict_backed, count), 1),
+        }
+    return results
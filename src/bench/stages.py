@@ -0,0 +1,93 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from bench.corpus import write_corpus
+from blocks import block_to_block_type, markdown_to_blocks
+from generate import generate_pages_recursive
+from textnode import text_to_textnodes
+from to_html import markdown_to_html_node
+
+
+# time_stage() runs func over every item in items, repeat times, and reports
+# the best run as operations and megabytes (of item input) per second.
+def time_stage(func, items, size_of, repeat=3):
+    total_bytes = sum(size_of(item) for item in items)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    best = max(best, 1e-9)
+    return {
+        "ops": len(items),
+        "seconds": round(best, 6),
+        "ops_per_sec": round(len(items) / best, 1),
+        "mb_per_sec": round(total_bytes / best / 1e6, 3),
+    }
+
+
+def utf8_size(text):
+    return len(text.encode())
+
+
+# inline_texts() collects the text of every block that goes through the
+# inline parser, joined the way the block converters join it.
+def inline_texts(blocks):
+    texts = []
+    for block in blocks:
+        if block.startswith("```"):
+            continue
+        for line in block.split("\n"):
+            line = line.lstrip("#>- ").split(". ", 1)[-1]
+            texts.append(line)
+    return texts
+
+
+def run_stages(pages, repeat=3):
+    blocks = [block for page in pages for block in markdown_to_blocks(page)]
+    texts = inline_texts(blocks)
+    trees = [markdown_to_html_node(page) for page in pages]
+
+    return {
+        "markdown_to_blocks": time_stage(markdown_to_blocks, pages, utf8_size, repeat),
+        "block_to_block_type": time_stage(
+            block_to_block_type, blocks, utf8_size, repeat
+        ),
+        "text_to_textnodes": time_stage(text_to_textnodes, texts, utf8_size, repeat),
+        "markdown_to_html_node": time_stage(
+            markdown_to_html_node, pages, utf8_size, repeat
+        ),
+        "to_html": time_stage(
+            lambda tree: tree.to_html(),
+            trees,
+            lambda tree: utf8_size(tree.to_html()),
+            repeat,
+        ),
+    }
+
+
+# time_site_build() writes pages into a temporary content directory and times
+# a full generate_pages_recursive build of it.
+def time_site_build(pages, template_path="template.html", jobs=1):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        dest_dir = os.path.join(tmp, "docs")
+        write_corpus(pages, content_dir)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                "/", content_dir, template_path, dest_dir, jobs=jobs
+            )
+        elapsed = time.perf_counter() - start
+    return {
+        "pages": len(pages),
+        "jobs": jobs,
+        "seconds": round(elapsed, 6),
+        "pages_per_sec": round(len(pages) / elapsed, 1),
+    }
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# STARTUP_COMMANDS are the interpreter arguments whose startup is measured.
+# The CLI fast paths and importing the CLI module must not import any of the
+# generator's modules.
+STARTUP_COMMANDS = {
+    "version": [os.path.join(SRC_DIR, "main.py"), "--version"],
+    "check": [os.path.join(SRC_DIR, "main.py"), "--check"],
+    "import_main": ["-c", "import main"],
+    "import_builder": ["-c", "import builder"],
+}
+LIGHTWEIGHT_COMMANDS = ("version", "import_main")
+
+
+# parse_importtime() turns the stderr of python -X importtime into a dict of
+# module name to (self, cumulative) import time in microseconds.
+def parse_importtime(stderr):
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def run_importtime(args):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def generator_modules():
+    return {
+        name[: -len(".py")]
+        for name in os.listdir(SRC_DIR)
+        if name.endswith(".py") and not name.startswith("test_")
+    }
+
+
+# measure_startup() times each command's best wall time over repeat runs and
+# reports what it imports beyond a bare interpreter: the import time of those
+# modules, the slowest of them, and which generator modules were loaded.
+def measure_startup(repeat=5, top=5):
+    _, baseline = run_importtime(["-c", "pass"])
+    own_modules = generator_modules()
+    results = {}
+    for name, args in STARTUP_COMMANDS.items():
+        best, modules = None, {}
+        for _ in range(repeat):
+            elapsed, run_modules = run_importtime(args)
+            if best is None or elapsed < best:
+                best, modules = elapsed, run_modules
+        extra = {m: times for m, times in modules.items() if m not in baseline}
+        slowest = sorted(extra.items(), key=lambda x: x[1][0], reverse=True)[:top]
+        results[name] = {
+            "seconds": round(best, 6),
+            "import_ms": round(sum(t[0] for t in extra.values()) / 1e3, 3),
+            "modules": len(extra),
+            "slowest": [[m, round(t[0] / 1e3, 3)] for m, t in slowest],
+            "generator_modules": sorted(own_modules & extra.keys()),
+        }
+    return results
+
+
+# check_startup() returns the startup regressions found in results: a
+# lightweight command that loads generator modules, or one whose imports take
+# longer than budget_ms.
+def check_startup(results, budget_ms):
+    problems = []
+    for name in LIGHTWEIGHT_COMMANDS:
+        result = results[name]
+        loaded = [m for m in result["generator_modules"] if m != "main"]
+        if loaded:
+            problems.append(f"{name} imports generator modules: {', '.join(loaded)}")
+        if budget_ms is not None and result["import_ms"] > budget_ms:
+            problems.append(
+                f"{name} spends {result['import_ms']} ms importing "
+                f"(budget {budget_ms} ms)"
+            )
+    return problems
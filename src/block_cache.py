@@ -0,0 +1,98 @@
+import hashlib
+from collections import OrderedDict
+
+
+# BlockCache memoizes the rendered HTML of markdown blocks, keyed by a hash of
+# the block's type and text. Entries live in an in-memory LRU of at most
+# max_entries blocks and, when a path is given, in an sqlite store that
+# persists across builds. The store is cleared when it was written by a
+# different version of the generator (see manifest.generator_hash()).
+class BlockCache:
+    def __init__(self, max_entries=10000, path=None, version=""):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if path is not None:
+            self.db = open_store(path, version)
+
+    # key() hashes a block. The namespace separates renderings of the same
+    # block that differ by context, such as the basepath links are rebased to.
+    @staticmethod
+    def key(block_type, lines, namespace=""):
+        digest = hashlib.sha256()
+        digest.update(namespace.encode())
+        digest.update(b"\0")
+        digest.update(block_type.value.encode())
+        for line in lines:
+            digest.update(b"\n")
+            digest.update(line.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+        if self.db is not None:
+            row = self.db.execute(
+                "SELECT html FROM blocks WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                self.remember(key, row[0])
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, html):
+        self.remember(key, html)
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO blocks (key, html) VALUES (?, ?)", (key, html)
+            )
+
+    def remember(self, key, html):
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+
+def open_store(path, version):
+    import sqlite3
+
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+    db.execute("CREATE TABLE IF NOT EXISTS blocks (key TEXT PRIMARY KEY, html TEXT)")
+    row = db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+    if row is None or row[0] != version:
+        db.execute("DELETE FROM blocks")
+        db.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)",
+            (version,),
+        )
+        db.commit()
+    return db
@@ -13,68 +13,106 @@ class BlockType(Enum):
 
 
 def markdown_to_blocks(text):
-    return [block.strip() for block in text.split("\n\n") if block != ""]
+    return ["\n".join(lines) for _, lines in iter_blocks(text.split("\n"))]
 
 
 def block_to_block_type(block):
-    # heading block
-    if block.startswith("#"):
-        has_hash_prefix = True
-        ends_with_space = False
-        for idx in range(0, min(7, len(block))):
-            if block[idx] == " ":
-                ends_with_space = True
-                break
-            if block[idx] != "#":
-                has_hash_prefix = False
-                break
-        if has_hash_prefix and ends_with_space:
+    scanner = BlockScanner(strip=False)
+    for line in block.split("\n"):
+        scanner.add(line)
+    return scanner.block_type()
+
+
+# iter_blocks() reads markdown line by line, from a file object or any other
+# iterable of lines, and yields a (BlockType, lines) pair per block as soon as
+# the block ends. Blocks are separated by empty lines; like str.strip() on the
+# block text, whitespace-only lines at the start and end of a block are
+# dropped, and the first and last lines are stripped of leading and trailing
+# whitespace respectively. Blocks without any content are skipped.
+def iter_blocks(lines):
+    scanner = BlockScanner()
+    for line in lines:
+        line = line.removesuffix("\n")
+        if line != "":
+            scanner.add(line)
+            continue
+        if scanner.has_content():
+            yield scanner.block_type(), scanner.lines
+            scanner = BlockScanner()
+    if scanner.has_content():
+        yield scanner.block_type(), scanner.lines
+
+
+# BlockScanner classifies a block while its lines are added, so that the lines
+# are only looked at once. With strip, each line is checked against the quote
+# and list prefixes when the next line arrives, as only then is it known not to
+# be the last line, which is stripped of trailing whitespace first.
+class BlockScanner:
+    def __init__(self, strip=True):
+        self.strip = strip
+        self.lines = []
+        self.pending = []
+        self.last = None
+        self.is_quote = True
+        self.is_unordered_list = True
+        self.is_ordered_list = True
+
+    def add(self, line):
+        if not self.strip:
+            self.check(line)
+            self.lines.append(line)
+            return
+        if line.strip() == "":
+            if self.last is not None:
+                self.pending.append(line)
+            return
+        if self.last is None:
+            line = line.lstrip()
+        else:
+            self.check(self.last)
+            self.lines.append(self.last)
+            for blank in self.pending:
+                self.check(blank)
+                self.lines.append(blank)
+            self.pending = []
+        self.last = line
+
+    def has_content(self):
+        return self.last is not None or len(self.lines) > 0
+
+    def check(self, line):
+        self.is_quote = self.is_quote and line.startswith(">")
+        self.is_unordered_list = self.is_unordered_list and line.startswith("-")
+        self.is_ordered_list = self.is_ordered_list and line.startswith(
+            f"{len(self.lines) + 1}. "
+        )
+
+    # block_type() finishes the block: the last line is stripped and checked,
+    # and the block's type is returned.
+    def block_type(self):
+        if self.last is not None:
+            self.last = self.last.rstrip()
+            self.check(self.last)
+            self.lines.append(self.last)
+            self.last = None
+            self.pending = []
+        lines = self.lines
+        if len(lines) == 0:
+            return BlockType.PARAGRAPH
+
+        if is_heading(lines[0]):
             return BlockType.HEADING
+        if len(lines) > 1 and lines[0].startswith("```") and lines[-1] == "```":
+            return BlockType.CODE
+        if self.is_quote:
+            return BlockType.QUOTE
+        if self.is_unordered_list:
+            return BlockType.UNORDERED_LIST
+        if self.is_ordered_list:
+            return BlockType.ORDERED_LIST
+        return BlockType.PARAGRAPH
+
 
-    # code block
-    if block.startswith("```") and block.endswith("\n```"):
-        return BlockType.CODE
-
-    # quote block
-    is_quote = True
-    while is_quote:
-        lines = block.split("\n")
-        for line in lines:
-            if not line.startswith(">"):
-                is_quote = False
-                break
-        break
-
-    if is_quote:
-        return BlockType.QUOTE
-
-    # unordered-list block
-    is_unordered_list = True
-    while is_unordered_list:
-        lines = block.split("\n")
-        for line in lines:
-            if not line.startswith("-"):
-                is_unordered_list = False
-                break
-        break
-
-    if is_unordered_list:
-        return BlockType.UNORDERED_LIST
-
-    # ordered-list block
-    is_ordered_list = True
-    i = 1
-    while is_ordered_list:
-        lines = block.split("\n")
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                is_ordered_list = False
-                break
-            i += 1
-        break
-
-    if is_ordered_list:
-        return BlockType.ORDERED_LIST
-
-    # paragraph block
-    return BlockType.PARAGRAPH
+def is_heading(line):
+    hashes = len(line) - len(line.lstrip("#"))
+    return 1 <= hashes <= 6 and line[hashes : hashes + 1] == " "
@@ -0,0 +1,414 @@
+import itertools
+import json
+import os
+
+import profiler
+from generate import (
+    cache_namespace,
+    discover_pages,
+    init_render_worker,
+    render_in_worker,
+    generate_pages_recursive,
+    page_handler,
+    read_source,
+    rebase_transform,
+    recursive_copy,
+    render_page,
+    scan_site,
+)
+from fingerprint import fingerprint_assets, scan_assets, template_hash
+from fsutil import write_if_changed
+from manifest import MANIFEST_NAME, Manifest, generator_hash
+from metadata import METADATA_CACHE_NAME, MetadataCache
+from references import reference_target
+from search import SearchIndex
+from shard import (
+    copy_shard_pages,
+    select_shard,
+    shard_dir_name,
+    verify_shards,
+    write_shard_manifest,
+)
+from template import load_template
+from to_html import markdown_to_html_node
+
+SITE_INDEX_NAME = "site-index.json"
+
+
+# Builder is the generator as a library. It holds a site's paths and options,
+# and keeps the compiled template, the BlockCache and (with jobs > 1) a pool
+# of render processes across calls, so a long-lived process can render many
+# documents or rebuild the site without redoing work that has not changed.
+# The defaults are the paths main.py uses, relative to the working directory.
+# With fingerprint, static assets are copied to content-hashed names as well
+# (see fingerprint.py) and pages reference those; render() and friends use the
+# fingerprints of the last build. With search, build() maintains a search
+# index of the pages (see search.SearchIndex), and with site_index it writes
+# the site index of scan_site() to SITE_INDEX_NAME before rendering any page.
+class Builder:
+    def __init__(
+        self,
+        content_dir="content",
+        static_dir="static",
+        template_path="template.html",
+        dest_dir="docs",
+        basepath="/",
+        jobs=1,
+        cache=None,
+        io_threads=0,
+        io_depth=16,
+        fingerprint=False,
+        search=False,
+        site_index=False,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.jobs = jobs
+        self.cache = cache
+        self.io_threads = io_threads
+        self.io_depth = io_depth
+        self.fingerprint = fingerprint
+        self.search = search
+        self.site_index = site_index
+        self.metadata = None
+        self.assets = None
+        self.executor = None
+        self.executor_template = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # template() returns the compiled template, which is only read and
+    # compiled again after the template file changed.
+    def template(self):
+        return load_template(self.template_path, self.basepath, self.assets)
+
+    # render() returns the full HTML page for a markdown document.
+    def render(self, markdown):
+        return render_page(
+            self.basepath,
+            markdown,
+            self.template(),
+            self.cache,
+            assets=self.assets,
+        )
+
+    # render_content() returns the HTML of a markdown document's body alone,
+    # without the template.
+    def render_content(self, markdown):
+        node = markdown_to_html_node(
+            markdown,
+            rebase_transform(self.basepath, self.assets),
+            self.cache,
+            cache_namespace(self.basepath, self.assets),
+        )
+        return node.to_html()
+
+    # render_many() yields the full HTML page of every markdown document, in
+    # order. With jobs > 1 the documents are rendered by the process pool.
+    def render_many(self, documents):
+        if self.jobs <= 1:
+            for markdown in documents:
+                yield self.render(markdown)
+            return
+        names = (f"document {i}" for i in itertools.count())
+        yield from self.pool().map(render_in_worker, names, documents)
+
+    # render_file() returns the full HTML page for a content file, rendered by
+    # the PageHandler of its extension.
+    def render_file(self, path):
+        handler = page_handler(path)
+        if handler is None:
+            raise Exception(f"no page handler for {path}")
+        return render_page(
+            self.basepath,
+            read_source(path),
+            self.template(),
+            self.cache,
+            handler,
+            self.assets,
+        )
+
+    # render_files() yields a (path, HTML page) pair for every content file.
+    def render_files(self, paths):
+        paths = list(paths)
+        if self.jobs <= 1:
+            for path in paths:
+                yield path, self.render_file(path)
+            return
+        for path in paths:
+            if page_handler(path) is None:
+                raise Exception(f"no page handler for {path}")
+        documents = map(read_source, paths)
+        yield from zip(paths, self.pool().map(render_in_worker, paths, documents))
+
+    # build() renders the site into dest_dir. A full build replaces dest_dir
+    # with a copy of static_dir before rendering every page; an incremental
+    # build syncs static_dir into it and only renders pages whose inputs
+    # changed (see generate_pages_recursive()). With explain, the reason each
+    # page is rendered, the pages referencing each changed static file and the
+    # references that lead nowhere are printed.
+    def build(
+        self, incremental=False, checksum=False, copy_method="copy", explain=False
+    ):
+        if not os.path.exists(self.dest_dir):
+            raise Exception(
+                f"destination directory at {os.path.abspath(self.dest_dir)} not found"
+            )
+        if not os.path.exists(self.static_dir):
+            raise Exception(
+                f"source directory at {os.path.abspath(self.static_dir)} not found"
+            )
+
+        manifest = None
+        if self.site_index:
+            # loaded before a full build empties dest_dir, and saved again
+            # by scan_site()
+            self.load_metadata()
+        if not incremental:
+            import shutil
+
+            with profiler.stage("copy_static"):
+                shutil.rmtree(self.dest_dir)
+                os.mkdir(self.dest_dir)
+                recursive_copy(self.static_dir, self.dest_dir)
+        else:
+            from sync import sync_tree
+
+            with profiler.stage("copy_static"):
+                stats = sync_tree(self.static_dir, self.dest_dir, checksum, copy_method)
+            print(
+                f"Synced {self.static_dir} to {self.dest_dir}: {stats.copied} copied, "
+                f"{stats.skipped} skipped, {stats.removed} removed, "
+                f"{stats.bytes_copied} bytes"
+            )
+        if self.fingerprint:
+            self.copy_fingerprinted(copy_method)
+        if incremental:
+            manifest = Manifest.load(
+                os.path.join(self.dest_dir, MANIFEST_NAME),
+                generator_hash(),
+                template_hash(self.template_path, self.assets),
+            )
+            if explain:
+                explain_static_changes(manifest, stats)
+        if self.site_index:
+            self.write_site_index()
+        search = None
+        if self.search:
+            search = SearchIndex.load(self.dest_dir, self.basepath)
+
+        generate_pages_recursive(
+            self.basepath,
+            self.content_dir,
+            self.template_path,
+            self.dest_dir,
+            manifest,
+            self.jobs,
+            self.cache,
+            self.io_threads,
+            self.io_depth,
+            explain,
+            assets=self.assets,
+            search=search,
+        )
+        if search is not None:
+            with profiler.stage("search_index"):
+                changed = search.save()
+            print(f"Search index: {len(search.pages)} pages, {changed} chunks written")
+        if manifest is not None:
+            manifest.save()
+            if explain:
+                explain_broken_references(manifest, self.dest_dir)
+
+    # build_shard() renders the pages of shard (index, count) into out_dir
+    # (docs-shard-<index>-of-<count> by default), which merge() later combines
+    # with the other shards. Static files are left to merge(). Incremental
+    # shard builds keep their own manifest in out_dir.
+    def build_shard(self, shard, out_dir=None, incremental=False, explain=False):
+        import shutil
+
+        if out_dir is None:
+            out_dir = shard_dir_name(shard)
+        manifest = None
+        if not incremental:
+            shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir, exist_ok=True)
+        if self.fingerprint:
+            # the assets are copied by merge()
+            self.assets = scan_assets(self.static_dir)
+        build_info = self.build_info()
+        if incremental:
+            manifest = Manifest.load(
+                os.path.join(out_dir, MANIFEST_NAME),
+                build_info["generator"],
+                build_info["template"],
+            )
+
+        generate_pages_recursive(
+            self.basepath,
+            self.content_dir,
+            self.template_path,
+            out_dir,
+            manifest,
+            self.jobs,
+            self.cache,
+            self.io_threads,
+            self.io_depth,
+            explain,
+            shard,
+            self.assets,
+        )
+        if manifest is not None:
+            manifest.save()
+
+        pages = select_shard(
+            discover_pages(self.content_dir, out_dir), self.content_dir, shard
+        )
+        write_shard_manifest(out_dir, shard, build_info, list(pages))
+        return out_dir
+
+    # build_info() returns the inputs and options a shard is built with, which
+    # merge() requires to match its own.
+    def build_info(self):
+        return {
+            "basepath": self.basepath,
+            "generator": generator_hash(),
+            "template": template_hash(self.template_path, self.assets),
+            "assets": self.assets and self.assets.digest,
+        }
+
+    # merge() replaces dest_dir with a copy of static_dir and the pages of the
+    # shard directories, once shard.verify_shards() found them to be complete,
+    # free of collisions and built with this builder's own basepath, template,
+    # generator and asset fingerprints. dest_dir is not touched when
+    # verification fails.
+    def merge(self, shard_dirs, copy_method="copy"):
+        import shutil
+
+        expected = [
+            os.path.relpath(dest_path, self.dest_dir)
+            for _, dest_path in discover_pages(self.content_dir, self.dest_dir)
+        ]
+        if self.fingerprint:
+            self.assets = scan_assets(self.static_dir)
+        owners = verify_shards(shard_dirs, expected, self.build_info())
+        with profiler.stage("copy_static"):
+            shutil.rmtree(self.dest_dir, ignore_errors=True)
+            os.mkdir(self.dest_dir)
+            recursive_copy(self.static_dir, self.dest_dir)
+        if self.fingerprint:
+            self.copy_fingerprinted(copy_method)
+        copy_shard_pages(owners, self.dest_dir, copy_method)
+        print(
+            f"Merged {len(owners)} pages from {len(shard_dirs)} shards "
+            f"into {self.dest_dir}"
+        )
+
+    # compress() writes precompressed .gz (and .br) siblings of the text files
+    # in dest_dir with self.jobs threads, skipping files that are unchanged
+    # since the last compress() (see compress.compress_tree()).
+    def compress(self):
+        from compress import compress_tree
+
+        with profiler.stage("compress"):
+            stats = compress_tree(self.dest_dir, self.jobs)
+        print(stats.report())
+        return stats
+
+    # scan_site() returns the site index of generate.scan_site(): the path,
+    # URL, title and metadata of every page, read from the headers of the
+    # sources alone. Headers are cached on the sources' mtime and size, in
+    # memory and in dest_dir across processes.
+    def scan_site(self):
+        self.load_metadata()
+        with profiler.stage("scan_site"):
+            site = scan_site(
+                self.basepath, self.content_dir, self.dest_dir, self.metadata
+            )
+        if os.path.isdir(self.dest_dir):
+            self.metadata.save()
+        return site
+
+    def load_metadata(self):
+        if self.metadata is None:
+            self.metadata = MetadataCache.load(
+                os.path.join(self.dest_dir, METADATA_CACHE_NAME)
+            )
+
+    def write_site_index(self):
+        site = self.scan_site()
+        data = json.dumps(site, indent=1, ensure_ascii=False).encode("utf-8")
+        write_if_changed(os.path.join(self.dest_dir, SITE_INDEX_NAME), data)
+        print(
+            f"Site index: {len(site)} pages, {self.metadata.hits} cached, "
+            f"{self.metadata.misses} scanned"
+        )
+
+    # copy_fingerprinted() copies the static assets to their fingerprinted
+    # names in dest_dir and keeps their AssetMap for rendering.
+    def copy_fingerprinted(self, copy_method="copy"):
+        with profiler.stage("fingerprint"):
+            self.assets, copied = fingerprint_assets(
+                self.static_dir, self.dest_dir, copy_method
+            )
+        print(f"Fingerprinted {len(self.assets.urls)} assets: {copied} copied")
+
+    # pool() returns the render process pool, replacing it when the template
+    # or the asset fingerprints changed since its workers compiled it.
+    def pool(self):
+        stat = os.stat(self.template_path)
+        version = (stat.st_mtime_ns, stat.st_size, self.assets and self.assets.digest)
+        if self.executor is not None and self.executor_template == version:
+            return self.executor
+        self.close_pool()
+        from concurrent.futures import ProcessPoolExecutor
+
+        with open(self.template_path, "r") as f:
+            template_content = f.read()
+        cache_size = None if self.cache is None else self.cache.max_entries
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=init_render_worker,
+            initargs=(self.basepath, template_content, cache_size, self.assets),
+        )
+        self.executor_template = version
+        return self.executor
+
+    def close_pool(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+            self.executor_template = None
+
+    def close(self):
+        self.close_pool()
+        if self.cache is not None:
+            self.cache.close()
+
+
+# explain_static_changes() prints the pages that reference each static file a
+# sync copied or removed. Those pages are not rendered again, as their HTML
+# does not depend on the referenced file.
+def explain_static_changes(manifest, stats):
+    changes = [(path, "copied") for path in stats.copied_files]
+    changes += [(path, "removed") for path in stats.removed_files]
+    for path, change in changes:
+        url = "/" + path.replace(os.sep, "/")
+        pages = manifest.referenced_by(url)
+        referenced = f"referenced by {', '.join(pages)}" if pages else "unreferenced"
+        print(f"Static file {url} {change}: {referenced}")
+
+
+def explain_broken_references(manifest, dest_dir):
+    for dest_path, entry in sorted(manifest.entries.items()):
+        for url in entry.get("refs", ()):
+            if reference_target(url, dest_dir) is None:
+                print(f"Broken reference in {dest_path}: {url}")
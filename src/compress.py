@@ -0,0 +1,177 @@
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fsutil import write_if_changed
+from manifest import hash_bytes
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+COMPRESS_MANIFEST_NAME = ".compress-manifest.json"
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json", ".xml", ".txt")
+SIBLING_SUFFIXES = (".gz", ".br")
+
+
+# gzip_compress() is deterministic (no timestamp in the header), so unchanged
+# inputs produce byte-identical siblings that write_if_changed() leaves alone.
+def gzip_compress(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+# encoders() maps the suffix of every precompressed sibling that is written to
+# the function producing it.
+def encoders():
+    result = {".gz": gzip_compress}
+    if brotli is not None:
+        result[".br"] = brotli_compress
+    return result
+
+
+# TypeStats accumulates, for the files of one extension, how many were
+# compressed or skipped, their size and the size and time of each encoding.
+class TypeStats:
+    def __init__(self):
+        self.files = 0
+        self.skipped = 0
+        self.size = 0
+        self.compressed = {}
+        self.seconds = {}
+
+    def add(self, size, results):
+        if results is None:
+            self.skipped += 1
+            return
+        self.files += 1
+        self.size += size
+        for suffix, (compressed, seconds) in results.items():
+            self.compressed[suffix] = self.compressed.get(suffix, 0) + compressed
+            self.seconds[suffix] = self.seconds.get(suffix, 0.0) + seconds
+
+    def ratio(self, suffix):
+        if not self.size:
+            return 0.0
+        return self.compressed.get(suffix, 0) / self.size
+
+
+class CompressStats:
+    def __init__(self, suffixes):
+        self.suffixes = suffixes
+        self.types = {}
+        self.removed = 0
+        self.wall = 0.0
+
+    def add(self, path, size, results):
+        ext = os.path.splitext(path)[1].lower()
+        self.types.setdefault(ext, TypeStats()).add(size, results)
+
+    def report(self):
+        header = f"{'type':<6} {'files':>6} {'skipped':>8} {'bytes':>10}"
+        for suffix in self.suffixes:
+            header += f" {suffix + ' ratio':>10} {suffix + ' ms':>10}"
+        lines = [header]
+        for ext, s in sorted(self.types.items()):
+            line = f"{ext:<6} {s.files:>6} {s.skipped:>8} {s.size:>10}"
+            for suffix in self.suffixes:
+                line += (
+                    f" {s.ratio(suffix):>10.1%}"
+                    f" {s.seconds.get(suffix, 0.0) * 1e3:>10.3f}"
+                )
+            lines.append(line)
+        lines.append(
+            f"wall {self.wall * 1e3:.3f} ms, {self.removed} stale siblings removed"
+        )
+        return "\n".join(lines)
+
+
+# compress_tree() writes a precompressed sibling (index.html.gz, and
+# index.html.br when brotli is installed) next to every text file under
+# dest_dir, using jobs threads (zlib and brotli release the GIL while they
+# compress). The content hash of every compressed file is kept in
+# COMPRESS_MANIFEST_NAME, and a file whose hash is unchanged and whose
+# siblings exist is skipped. Siblings of files that are gone, or of encodings
+# that are no longer available, are removed. Returns the CompressStats.
+def compress_tree(dest_dir, jobs=1):
+    start = time.perf_counter()
+    active = encoders()
+    stats = CompressStats(list(active))
+    manifest_path = os.path.join(dest_dir, COMPRESS_MANIFEST_NAME)
+    known = load_hashes(manifest_path)
+    paths = list(compressible_files(dest_dir))
+
+    def task(rel_path):
+        path = os.path.join(dest_dir, rel_path)
+        return compress_file(path, known.get(rel_path), active)
+
+    if jobs > 1:
+        with ThreadPoolExecutor(jobs, thread_name_prefix="compress") as pool:
+            results = list(pool.map(task, paths))
+    else:
+        results = [task(rel_path) for rel_path in paths]
+
+    hashes = {}
+    for rel_path, (digest, size, encoded) in zip(paths, results):
+        hashes[rel_path] = digest
+        stats.add(rel_path, size, encoded)
+
+    inactive = [s for s in SIBLING_SUFFIXES if s not in active]
+    stale = [(rel_path, SIBLING_SUFFIXES) for rel_path in known.keys() - hashes]
+    stale += [(rel_path, inactive) for rel_path in hashes]
+    for rel_path, suffixes in stale:
+        for suffix in suffixes:
+            sibling = os.path.join(dest_dir, rel_path + suffix)
+            if os.path.exists(sibling):
+                os.remove(sibling)
+                stats.removed += 1
+
+    with open(manifest_path, "w") as f:
+        json.dump(hashes, f, indent=1, sort_keys=True)
+    stats.wall = time.perf_counter() - start
+    return stats
+
+
+# compress_file() writes the siblings of path with every encoder, unless its
+# content hash is known_hash and they all exist. Returns (hash, size, results)
+# where results maps each suffix to (compressed size, seconds), or is None
+# when the file was skipped.
+def compress_file(path, known_hash, active):
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hash_bytes(data)
+    if digest == known_hash and all(os.path.exists(path + s) for s in active):
+        return digest, len(data), None
+    results = {}
+    for suffix, encode in active.items():
+        start = time.perf_counter()
+        encoded = encode(data)
+        results[suffix] = (len(encoded), time.perf_counter() - start)
+        write_if_changed(path + suffix, encoded)
+    return digest, len(data), results
+
+
+# compressible_files() lists the text files under dest_dir relative to it,
+# skipping the build's own dotfiles (manifests).
+def compressible_files(dest_dir):
+    for dir_path, _, file_names in os.walk(dest_dir):
+        for file_name in sorted(file_names):
+            if file_name.startswith("."):
+                continue
+            if os.path.splitext(file_name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                path = os.path.join(dir_path, file_name)
+                yield os.path.relpath(path, dest_dir)
+
+
+def load_hashes(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
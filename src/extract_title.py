@@ -1,5 +1,19 @@
+import re
+
+HTML_TITLE_REGEX = re.compile(r"<h1(?:\s[^>]*)?>(.*?)</h1>", re.DOTALL)
+
+
 def extract_title(markdown):
     top_line = markdown.split("\n", 1)[0]
     if not top_line.startswith("# "):
         raise Exception("markdown document must start with an 'h1' heading")
     return top_line.removeprefix("# ")
+
+
+# extract_html_title() returns the contents of the first 'h1' element of an
+# HTML fragment.
+def extract_html_title(html):
+    match = HTML_TITLE_REGEX.search(html)
+    if match is None:
+        raise Exception("html fragment must contain an 'h1' heading")
+    return match[1].strip()
@@ -0,0 +1,123 @@
+import json
+import os
+
+from fsutil import copy_file, remove_empty_dirs
+from manifest import hash_bytes, hash_file
+from references import find_html_references
+from sync import walk_files
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+FINGERPRINT_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".svg",
+    ".webp",
+    ".avif",
+    ".woff",
+    ".woff2",
+)
+# hex digits of the content hash kept in a fingerprinted name
+FINGERPRINT_LENGTH = 16
+
+
+# AssetMap maps the root-relative URL of every fingerprinted static asset to
+# the URL of its content-hashed copy. digest identifies the whole mapping, for
+# caches whose entries contain rewritten URLs.
+class AssetMap:
+    def __init__(self, urls):
+        self.urls = urls
+        self.digest = hash_bytes(json.dumps(urls, sort_keys=True).encode())
+
+    # rewrite() returns url pointing to the fingerprinted copy of its asset,
+    # keeping any query string or fragment, or url itself for other URLs.
+    def rewrite(self, url):
+        end = len(url)
+        for sep in "?#":
+            pos = url.find(sep)
+            if pos != -1:
+                end = min(end, pos)
+        hashed = self.urls.get(url[:end])
+        if hashed is None:
+            return url
+        return hashed + url[end:]
+
+    # subset() returns the fingerprinted URLs of the referenced assets among
+    # refs, which is what a page's HTML depends on.
+    def subset(self, refs):
+        return {url: self.urls[url] for url in refs if url in self.urls}
+
+
+# fingerprinted_name() inserts the content hash before the extension:
+# images/tom.png becomes images/tom.0123456789abcdef.png.
+def fingerprinted_name(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+# scan_assets() hashes the fingerprintable files under static_dir and returns
+# their AssetMap. The names only depend on file contents, so an unchanged
+# asset keeps its fingerprinted name across builds and machines.
+def scan_assets(static_dir):
+    urls = {}
+    for rel_path in walk_files(static_dir):
+        if os.path.splitext(rel_path)[1].lower() not in FINGERPRINT_EXTENSIONS:
+            continue
+        digest = hash_file(os.path.join(static_dir, rel_path))
+        url = "/" + rel_path.replace(os.sep, "/")
+        urls[url] = "/" + fingerprinted_name(rel_path, digest).replace(os.sep, "/")
+    return AssetMap(urls)
+
+
+# fingerprint_assets() copies every asset of static_dir to its fingerprinted
+# name under dest_dir, next to the copy under its plain name, and writes the
+# mapping to ASSET_MANIFEST_NAME. A fingerprinted file that already exists
+# holds the same content and is not copied again; fingerprinted files of the
+# previous build that are no longer referenced are removed. Returns the
+# AssetMap and the number of files copied.
+def fingerprint_assets(static_dir, dest_dir, method="copy"):
+    assets = scan_assets(static_dir)
+    manifest_path = os.path.join(dest_dir, ASSET_MANIFEST_NAME)
+    previous = load_asset_manifest(manifest_path)
+
+    copied = 0
+    for url, hashed in sorted(assets.urls.items()):
+        dest_path = os.path.join(dest_dir, hashed[1:])
+        if os.path.exists(dest_path):
+            continue
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(os.path.join(static_dir, url[1:]), dest_path, method)
+        copied += 1
+
+    for hashed in sorted(set(previous.values()) - set(assets.urls.values())):
+        dest_path = os.path.join(dest_dir, hashed[1:])
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir)
+
+    with open(manifest_path, "w") as f:
+        json.dump(assets.urls, f, indent=1, sort_keys=True)
+    return assets, copied
+
+
+def load_asset_manifest(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# template_hash() is the manifest's hash of the template: its content hash,
+# extended with the fingerprinted URLs of the assets it references when assets
+# are fingerprinted, as every rendered page embeds those.
+def template_hash(template_path, assets=None):
+    digest = hash_file(template_path)
+    if assets is None:
+        return digest
+    with open(template_path, "r") as f:
+        urls = assets.subset(find_html_references(f.read()))
+    return hash_bytes(json.dumps([digest, urls], sort_keys=True).encode())
@@ -0,0 +1,139 @@
+import os
+import shutil
+
+from manifest import hash_bytes, hash_file
+
+try:
+    import fcntl
+except ImportError:  # not available on windows
+    fcntl = None
+
+# ioctl request number for FICLONE on linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+COPY_METHODS = ("copy", "reflink", "hardlink")
+
+
+# copy_file() copies src to dst through a temporary sibling that is renamed into
+# place, so readers never observe a partially written dst. The method selects
+# how bytes are moved:
+#   - "copy": in-kernel copy_file_range (falling back to shutil)
+#   - "reflink": a copy-on-write clone where the filesystem supports it,
+#     falling back to "copy"
+#   - "hardlink": a hard link to src, falling back to "copy" when src and dst
+#     are on different filesystems
+# It returns the number of bytes that were physically written.
+def copy_file(src, dst, method="copy"):
+    if method not in COPY_METHODS:
+        raise ValueError(f"unknown copy method '{method}'")
+
+    tmp = temp_path(dst)
+    try:
+        if method == "hardlink":
+            try:
+                os.link(src, tmp)
+                os.replace(tmp, dst)
+                return 0
+            except OSError:
+                # never write through a link to src
+                if os.path.lexists(tmp):
+                    os.remove(tmp)
+
+        written = 0
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            if method != "reflink" or not _reflink(fsrc, fdst):
+                written = _copy_contents(fsrc, fdst)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+        return written
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def temp_path(path):
+    return f"{path}.{os.getpid()}.tmp"
+
+
+# write_if_changed() writes data (bytes) to path through a temporary sibling
+# that is renamed into place, unless path already holds exactly data. An
+# identical path is left untouched, mtime included, so rsync and deploy tools
+# see no change. It returns whether path was written.
+def write_if_changed(path, data):
+    if has_contents(path, len(data), lambda: hash_bytes(data)):
+        return False
+    tmp = temp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# replace_if_changed() renames the completely written tmp over path, unless
+# path already has the same contents, in which case tmp is removed. It returns
+# whether path was replaced.
+def replace_if_changed(tmp, path):
+    if has_contents(path, os.path.getsize(tmp), lambda: hash_file(tmp)):
+        os.remove(tmp)
+        return False
+    os.replace(tmp, path)
+    return True
+
+
+# has_contents() compares path against contents of the given size and hash.
+# The hash is only computed when the sizes match.
+def has_contents(path, size, digest):
+    try:
+        if os.path.getsize(path) != size:
+            return False
+    except OSError:
+        return False
+    return hash_file(path) == digest()
+
+
+def _reflink(fsrc, fdst):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        return False
+
+
+def _copy_contents(fsrc, fdst):
+    size = os.fstat(fsrc.fileno()).st_size
+    if hasattr(os, "copy_file_range"):
+        try:
+            written = 0
+            while written < size:
+                n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - written)
+                if n == 0:
+                    break
+                written += n
+            if written == size:
+                return written
+            fsrc.seek(written)
+            fdst.seek(written)
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+    shutil.copyfileobj(fsrc, fdst)
+    return size
+
+
+# remove_empty_dirs() removes path and its parents for as long as they are
+# empty, stopping at (and never removing) root.
+def remove_empty_dirs(path, root):
+    root = os.path.abspath(root)
+    path = os.path.abspath(path)
+    while path != root and path.startswith(root + os.sep):
+        if os.listdir(path):
+            return
+        os.rmdir(path)
+        path = os.path.dirname(path)
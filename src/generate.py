@@ -0,0 +1,757 @@
+import functools
+import io
+import itertools
+import os
+import time
+from collections import deque
+
+from extract_title import extract_html_title, extract_title
+from fsutil import (
+    copy_file,
+    remove_empty_dirs,
+    replace_if_changed,
+    temp_path,
+    write_if_changed,
+)
+from manifest import hash_bytes, hash_file
+from metadata import (
+    MetadataCache,
+    html_header,
+    markdown_header,
+    read_front_matter,
+    separate_front_matter,
+)
+from profiler import is_enabled, page, stage
+from references import find_html_references, find_references
+from search import html_document, markdown_document, page_url
+from shard import select_shard
+from template import compile_template, load_template, rebase_literal, rebase_url
+from to_html import markdown_lines_to_html_node, markdown_to_html_node
+
+
+def recursive_copy(src, dst):
+    import shutil
+
+    contents = os.listdir(src)
+    sub_content = lambda a, b: a + "/" + b
+    for content in contents:
+        sub_src = sub_content(src, content)
+        sub_dst = sub_content(dst, content)
+        if os.path.isdir(sub_src):
+            os.makedirs(sub_dst, exist_ok=True)
+            recursive_copy(sub_src, sub_dst)
+            continue
+        shutil.copy(sub_src, sub_dst)
+
+
+# generate_file() turns a file under the content directory into its output:
+# files with a PageHandler are rendered into a page, other files are copied
+# unchanged. Returns whether dest_path was written.
+def generate_file(
+    basepath, from_path, template_path, dest_path, cache=None, assets=None
+):
+    if page_handler(from_path) is None:
+        return copy_content_file(from_path, dest_path)
+    return generate_page(basepath, from_path, template_path, dest_path, cache, assets)
+
+
+# copy_content_file() copies a file that is not a page, such as an image next
+# to a post, in the kernel (see fsutil.copy_file()) without decoding it.
+def copy_content_file(from_path, dest_path):
+    print(f"Copying file {from_path} to {dest_path}")
+    make_parent_dirs(dest_path)
+    copy_file(from_path, dest_path)
+    return True
+
+
+# generate_page() streams the page into dest_path. With a handler that parses
+# lazily (such as markdown's), the source is parsed block by block while the
+# rendered HTML is being written, so neither the markdown nor the HTML of the
+# page is held in memory as a whole. The HTML is streamed into a temporary
+# file that only replaces dest_path if it differs from it; returns whether
+# dest_path was written. With assets (a fingerprint.AssetMap), URLs of static
+# assets are rewritten to their fingerprinted copies. source, when given, is
+# the source's content as read by the caller, which is not read again. While
+# profiling, pages are generated by generate_page_profiled() instead.
+def generate_page(
+    basepath,
+    from_path,
+    template_path,
+    dest_path,
+    cache=None,
+    assets=None,
+    source=None,
+):
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    handler = page_handler(from_path) or MARKDOWN_HANDLER
+    if is_enabled():
+        return generate_page_profiled(
+            basepath,
+            from_path,
+            template_path,
+            dest_path,
+            cache,
+            assets,
+            handler,
+            source,
+        )
+    template = load_template(template_path, basepath, assets)
+    with open_source(from_path, source) as src:
+        if handler.stream_values is not None:
+            values = handler.stream_values(basepath, src, cache, assets)
+        else:
+            values = handler.values(basepath, src.read(), cache, assets)
+        make_parent_dirs(dest_path)
+        tmp = temp_path(dest_path)
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                template.write(f, values)
+            return replace_if_changed(tmp, dest_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+# generate_page_profiled() is generate_page() with every step in a span of its
+# own: the source is read up front ('read') and the page is serialized into
+# memory ('serialize': HTML serialization and template substitution, with the
+# parsing it drives nested in 'parse_blocks' and 'parse_inline') before it is
+# written ('write'), so I/O is never counted as parsing or serialization.
+def generate_page_profiled(
+    basepath, from_path, template_path, dest_path, cache, assets, handler, source
+):
+    with page(from_path):
+        with stage("template"):
+            template = load_template(template_path, basepath, assets)
+        with stage("read"):
+            content = read_source(from_path, source)
+        if handler.stream_values is not None:
+            values = handler.stream_values(
+                basepath, io.StringIO(content), cache, assets
+            )
+        else:
+            values = handler.values(basepath, content, cache, assets)
+        out = io.StringIO()
+        with stage("serialize"):
+            template.write(out, values)
+        with stage("write"):
+            return write_page(dest_path, out.getvalue())
+
+
+def render_page(
+    basepath, from_content, template, cache=None, handler=None, assets=None
+):
+    if handler is None:
+        handler = MARKDOWN_HANDLER
+    return template.render(handler.values(basepath, from_content, cache, assets))
+
+
+# page_values() parses markdown into the values a template is rendered with.
+# Root-relative links and images in the page body are rebased (and pointed at
+# fingerprinted assets) on the node tree, so the serialized HTML is not
+# scanned again. Front matter (see metadata.py) is not part of the page's
+# content; its keys are values of their own, for placeholders such as
+# '{{ author }}', and never replace Title or Content.
+def page_values(basepath, from_content, cache=None, assets=None):
+    metadata, from_content = separate_front_matter(from_content)
+    return {
+        **metadata,
+        "Title": extract_title(from_content),
+        "Content": markdown_to_html_node(
+            from_content,
+            rebase_transform(basepath, assets),
+            cache,
+            cache_namespace(basepath, assets),
+        ),
+    }
+
+
+# stream_page_values() is page_values() for an open source file. The title is
+# taken from the first line after any front matter; the content is parsed
+# lazily as it is written.
+def stream_page_values(basepath, fp, cache=None, assets=None):
+    metadata, first_line = read_front_matter(fp)
+    return {
+        **metadata,
+        "Title": extract_title(first_line),
+        "Content": markdown_lines_to_html_node(
+            itertools.chain([first_line], fp),
+            rebase_transform(basepath, assets),
+            cache,
+            cache_namespace(basepath, assets),
+        ),
+    }
+
+
+# cache_namespace() separates cached blocks by the URL rewrites applied to
+# them.
+def cache_namespace(basepath, assets):
+    if assets is None:
+        return basepath
+    return f"{basepath}#{assets.digest}"
+
+
+# fragment_values() takes an HTML fragment as the page content as it is,
+# rebasing its root-relative URLs, and its first 'h1' heading as the title.
+def fragment_values(basepath, from_content, cache=None, assets=None):
+    return {
+        "Title": extract_html_title(from_content),
+        "Content": rebase_literal(from_content, basepath, assets),
+    }
+
+
+# PageHandler describes how one kind of content file becomes a page. values()
+# returns the values the template is rendered with, from the file's text (with
+# the signature of page_values()).
+# stream_values(), when given, does the same from the open file, parsing it
+# lazily while the page is written. references() lists the root-relative URLs
+# the page references, and document() returns its title and search terms (see
+# search.markdown_document()). header() returns the title and metadata from
+# the start of the file's text alone (see scan_site()).
+class PageHandler:
+    def __init__(
+        self,
+        values,
+        stream_values=None,
+        references=None,
+        document=None,
+        header=None,
+    ):
+        self.values = values
+        self.stream_values = stream_values
+        self.references = references
+        self.document = document
+        self.header = header
+
+
+MARKDOWN_HANDLER = PageHandler(
+    page_values,
+    stream_page_values,
+    find_references,
+    markdown_document,
+    markdown_header,
+)
+HTML_HANDLER = PageHandler(
+    fragment_values, None, find_html_references, html_document, html_header
+)
+
+# PAGE_HANDLERS maps the extension of a file under the content directory to
+# its PageHandler; files with any other extension are copied as they are.
+# Handlers registered at runtime only reach process-pool workers that are
+# forked after the registration.
+PAGE_HANDLERS = {".md": MARKDOWN_HANDLER, ".html": HTML_HANDLER}
+
+
+def register_page_handler(extension, handler):
+    PAGE_HANDLERS[extension] = handler
+
+
+def page_handler(path):
+    return PAGE_HANDLERS.get(os.path.splitext(path)[1])
+
+
+def rebase_transform(basepath, assets=None):
+    if basepath == "/" and assets is None:
+        return None
+    return functools.partial(rebased, basepath=basepath, assets=assets)
+
+
+def rebased(node, basepath, assets=None):
+    rebase_urls(node, basepath, assets)
+    return node
+
+
+# write_page() writes text to dest_path unless it already holds it, and
+# returns whether it was written.
+def write_page(dest_path, text):
+    make_parent_dirs(dest_path)
+    return write_if_changed(dest_path, text.encode("utf-8"))
+
+
+def make_parent_dirs(path):
+    dirs, _ = os.path.split(path)
+    if len(dirs) > 0:
+        os.makedirs(dirs, exist_ok=True)
+
+
+def rebase_urls(node, basepath, assets=None):
+    if node.props is not None:
+        for attr in ("href", "src"):
+            url = node.props.get(attr)
+            if url is not None and url.startswith("/"):
+                node.props[attr] = rebase_url(url, basepath, assets)
+    if node.children is not None:
+        for child in node.children:
+            rebase_urls(child, basepath, assets)
+
+
+# discover_pages() walks the content directory and yields a (source, output)
+# path pair for every file, in directory-listing order.
+def discover_pages(dir_path_content, dest_dir_path):
+    sub_content = lambda a, b: a + "/" + b
+
+    contents = os.listdir(dir_path_content)
+    for content in contents:
+        this_content_path = sub_content(dir_path_content, content)
+        if os.path.isdir(this_content_path):
+            yield from discover_pages(
+                this_content_path, sub_content(dest_dir_path, content)
+            )
+            continue
+        yield (
+            this_content_path,
+            sub_content(dest_dir_path, output_name(content)),
+        )
+
+
+# output_name() names the output of a content file: pages are .html files,
+# other files keep their name.
+def output_name(name):
+    if page_handler(name) is None:
+        return name
+    return os.path.splitext(name)[0] + ".html"
+
+
+# page_dest_path() maps a single source file under dir_path_content to its
+# output path, the same way discover_pages() does.
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    rel_path = os.path.relpath(from_path, dir_path_content)
+    dirs, name = os.path.split(rel_path)
+    parts = [dest_dir_path] + ([dirs] if dirs else []) + [output_name(name)]
+    return "/".join(parts)
+
+
+# scan_site() returns the site index: the source path (relative to the
+# content directory), URL, title and metadata of every page, in discovery
+# order. Only the header at the start of each source is read (see
+# metadata.read_header()) and no page body is parsed, so the index is known
+# before any page is rendered. A MetadataCache skips the sources that are
+# unchanged since they were last scanned.
+def scan_site(basepath, dir_path_content, dest_dir_path, cache=None):
+    if cache is None:
+        cache = MetadataCache()
+    site = []
+    scanned = []
+    for from_path, dest_path in discover_pages(dir_path_content, dest_dir_path):
+        handler = page_handler(from_path)
+        if handler is None or handler.header is None:
+            continue
+        try:
+            title, metadata = cache.header(from_path, handler.header)
+        except Exception as e:
+            raise Exception(f"failed to scan {from_path}: {e}") from None
+        scanned.append(from_path)
+        rel_path = os.path.relpath(from_path, dir_path_content)
+        site.append(
+            {
+                "path": rel_path.replace(os.sep, "/"),
+                "url": page_url(dest_path, dest_dir_path, basepath),
+                "title": title,
+                "metadata": metadata,
+            }
+        )
+    cache.retain(scanned)
+    return site
+
+
+# generate_pages_recursive() renders every page under dir_path_content. When a
+# manifest is given, pages whose source, template and basepath are unchanged
+# since the last build are skipped, outputs whose sources have vanished are
+# removed, and the references of rendered pages are recorded. With explain, the
+# reason every page is rendered or skipped is printed. With a shard (index,
+# count), only the pages of that shard are rendered (see shard.shard_of()).
+# With jobs > 1 the pages are rendered by a pool of processes. A BlockCache
+# memoizes rendered blocks; pool workers each keep their own in-memory cache of
+# the same size instead. With io_threads > 0 sources are read and outputs
+# written by that many threads each, overlapping the I/O with rendering (see
+# generate_pages_pipelined()). With assets (a fingerprint.AssetMap), URLs of
+# static assets are rewritten to their fingerprinted copies, and a page is
+# rendered again when an asset it references changed. A search.SearchIndex is
+# updated with the terms of every page whose source changed since it was
+# indexed; sources read to hash them are rendered without being read again.
+def generate_pages_recursive(
+    basepath,
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest=None,
+    jobs=1,
+    cache=None,
+    io_threads=0,
+    io_depth=16,
+    explain=False,
+    shard=None,
+    assets=None,
+    search=None,
+):
+    discovered = discover_pages(dir_path_content, dest_dir_path)
+    if shard is not None:
+        discovered = select_shard(discovered, dir_path_content, shard)
+
+    pages = []
+    copies = []
+    refs = {}
+    template_refs = () if manifest is None else template_references(template_path)
+    fingerprints = {}
+    indexed = []
+    # sources read to hash them are rendered from memory instead of read again,
+    # unless a process pool renders them
+    sources = {}
+    keep_sources = io_threads > 0 or jobs <= 1
+    for from_path, dest_path in discovered:
+        handler = page_handler(from_path)
+        rendered = handler is not None
+        source = None
+        source_hash = None
+        reason = "full build"
+        if manifest is not None:
+            with stage("hash"):
+                if handler is None:
+                    source_hash = hash_file(from_path)
+                else:
+                    with open(from_path, "rb") as f:
+                        source = f.read()
+                    source_hash = hash_bytes(source)
+            page_refs = None
+            if assets is not None and rendered:
+                page_refs = page_references(handler, source)
+                fingerprints[dest_path] = assets.subset(page_refs or ())
+            reason = manifest.why_stale(
+                dest_path,
+                source_hash,
+                basepath,
+                rendered,
+                fingerprints.get(dest_path),
+            )
+        if search is not None and rendered:
+            url = page_url(dest_path, dest_dir_path, basepath)
+            indexed.append(url)
+            if source is None:
+                with stage("hash"):
+                    with open(from_path, "rb") as f:
+                        source = f.read()
+                    source_hash = hash_bytes(source)
+            # pages are indexed when their source differs from the indexed one
+            if search.source_hash(url) != source_hash:
+                with stage("index"):
+                    index_page(search, handler, source, url, source_hash)
+        if manifest is not None:
+            if reason is None:
+                if explain:
+                    print(f"Skipping {dest_path}: up to date")
+                continue
+            if rendered:
+                if page_refs is None:
+                    page_refs = page_references(handler, source)
+                page_refs = merge_references(page_refs, template_refs)
+            refs[dest_path] = page_refs
+        if explain:
+            print(f"Rebuilding {dest_path}: {reason}")
+        if handler is None:
+            copies.append((from_path, dest_path, source_hash))
+        else:
+            pages.append((from_path, dest_path, source_hash))
+            if keep_sources and source is not None:
+                sources[from_path] = source
+
+    if search is not None:
+        search.retain(indexed)
+
+    with stage("copy_content"):
+        copied = [(copy, copy_content_file(copy[0], copy[1])) for copy in copies]
+
+    if io_threads > 0 and pages:
+        generated, stats = generate_pages_pipelined(
+            basepath,
+            pages,
+            template_path,
+            io_threads,
+            io_depth,
+            jobs,
+            cache,
+            assets,
+            sources,
+        )
+        print(stats.report())
+    elif jobs > 1 and len(pages) > 1:
+        cache_size = None if cache is None else cache.max_entries
+        generated = generate_pages_parallel(
+            basepath, pages, template_path, jobs, cache_size, assets
+        )
+    else:
+        generated = generate_pages_serial(
+            basepath, pages, template_path, cache, assets, sources
+        )
+
+    unchanged = 0
+    for (from_path, dest_path, source_hash), written in itertools.chain(
+        copied, generated
+    ):
+        if not written:
+            unchanged += 1
+        if manifest is not None:
+            rendered = page_handler(from_path) is not None
+            manifest.record(
+                dest_path,
+                from_path,
+                source_hash,
+                basepath,
+                refs.get(dest_path),
+                rendered,
+                fingerprints.get(dest_path),
+            )
+    if unchanged:
+        print(f"Left {unchanged} unchanged pages untouched")
+
+    if manifest is not None:
+        remove_stale_outputs(manifest, dest_dir_path)
+
+
+def index_page(search, handler, source, url, source_hash=None):
+    if handler.document is not None:
+        title, terms = handler.document(source.decode("utf-8"))
+        search.update(url, title, terms, source_hash)
+
+
+# page_references() returns the references of a page's source bytes, or None
+# when its handler does not find references.
+def page_references(handler, source):
+    if handler.references is None:
+        return None
+    return handler.references(source.decode("utf-8"))
+
+
+# template_references() returns the root-relative URLs the template links to
+# or embeds, which every page rendered with it references as well.
+def template_references(template_path):
+    with open(template_path, "r") as f:
+        return find_html_references(f.read())
+
+
+# merge_references() appends the template's references to those of a page
+# rendered with it, as the page's HTML holds both.
+def merge_references(page_refs, template_refs):
+    return list(dict.fromkeys(itertools.chain(page_refs or (), template_refs)))
+
+
+# generate_pages_serial() renders pages one after the other. sources maps the
+# path of a page whose source was already read (to hash it) to its bytes.
+def generate_pages_serial(
+    basepath, pages, template_path, cache=None, assets=None, sources=None
+):
+    sources = {} if sources is None else sources
+    for page in pages:
+        from_path, dest_path, _ = page
+        written = generate_page(
+            basepath,
+            from_path,
+            template_path,
+            dest_path,
+            cache,
+            assets,
+            sources.pop(from_path, None),
+        )
+        yield page, written
+
+
+# generate_pages_parallel() fans the markdown-to-HTML work out to a process
+# pool. Results are consumed in discovery order, so logging and writes are
+# deterministic regardless of which worker finishes first. The template is
+# handed to each worker once, through the pool initializer, rather than being
+# pickled with every task.
+def generate_pages_parallel(
+    basepath, pages, template_path, jobs, cache_size=None, assets=None
+):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(template_path, "r") as f:
+        template_content = f.read()
+
+    from_paths = [from_path for from_path, _, _ in pages]
+    chunksize = max(1, len(from_paths) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_render_worker,
+        initargs=(basepath, template_content, cache_size, assets),
+    ) as executor:
+        results = executor.map(_render_worker_task, from_paths, chunksize=chunksize)
+        for page, text in zip(pages, results):
+            from_path, dest_path, _ = page
+            print(
+                f"Generating page from {from_path} to {dest_path} using {template_path}"
+            )
+            yield page, write_page(dest_path, text)
+
+
+# generate_pages_pipelined() renders pages through a pipeline.run_pipeline():
+# io_threads threads read sources at most io_depth pages ahead of rendering,
+# and as many threads write the rendered pages while later ones render. Pages
+# render on this thread, or in a pool of processes with jobs > 1, and are
+# logged in discovery order. Sources already read are taken from sources, as
+# in generate_pages_serial(). Returns (page, written) pairs for the generated
+# pages and the pipeline's queue and utilisation stats.
+def generate_pages_pipelined(
+    basepath,
+    pages,
+    template_path,
+    io_threads,
+    io_depth=16,
+    jobs=1,
+    cache=None,
+    assets=None,
+    sources=None,
+):
+    sources = {} if sources is None else sources
+    with stage("import"):
+        from pipeline import run_pipeline
+
+    def render(inputs, stats):
+        if jobs > 1:
+            stats.stage("render").workers = jobs
+            yield from render_pipelined_parallel(
+                basepath, inputs, template_path, jobs, cache, stats, assets
+            )
+            return
+        with stage("template"):
+            template = load_template(template_path, basepath, assets)
+        render_stats = stats.stage("render")
+        for page_info, content in inputs:
+            from_path, dest_path, _ = page_info
+            print(
+                f"Generating page from {from_path} to {dest_path} using {template_path}"
+            )
+            start = time.perf_counter()
+            with page(from_path), stage("serialize"):
+                text = render_page(
+                    basepath,
+                    content,
+                    template,
+                    cache,
+                    page_handler(from_path),
+                    assets,
+                )
+            render_stats.add(time.perf_counter() - start)
+            yield page_info, text
+
+    return run_pipeline(
+        pages,
+        read=lambda page_info: read_source(
+            page_info[0], sources.pop(page_info[0], None)
+        ),
+        render=render,
+        write=lambda page_info, text: write_page(page_info[1], text),
+        readers=io_threads,
+        writers=io_threads,
+        depth=io_depth,
+    )
+
+
+# read_source() returns the text of the source at path, decoding source, the
+# bytes already read from it, when given.
+def read_source(path, source=None):
+    if source is not None:
+        return source.decode("utf-8")
+    with open(path, "r") as f:
+        return f.read()
+
+
+# open_source() is read_source() as a text file object.
+def open_source(path, source=None):
+    if source is not None:
+        return io.StringIO(source.decode("utf-8"))
+    return open(path, "r")
+
+
+# render_pipelined_parallel() is the render stage of a pipelined build with a
+# process pool. At most 2 * jobs pages are in flight, so the pool does not
+# drain the read queue ahead of the workers.
+def render_pipelined_parallel(
+    basepath, inputs, template_path, jobs, cache, stats, assets=None
+):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(template_path, "r") as f:
+        template_content = f.read()
+    cache_size = None if cache is None else cache.max_entries
+    render_stats = stats.stage("render")
+
+    def finish(in_flight):
+        page_info, future = in_flight.popleft()
+        from_path, dest_path, _ = page_info
+        text, elapsed = future.result()
+        render_stats.add(elapsed)
+        print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+        return page_info, text
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_render_worker,
+        initargs=(basepath, template_content, cache_size, assets),
+    ) as executor:
+        in_flight = deque()
+        for page_info, content in inputs:
+            future = executor.submit(_render_content_task, page_info[0], content)
+            in_flight.append((page_info, future))
+            if len(in_flight) >= 2 * jobs:
+                yield finish(in_flight)
+        while in_flight:
+            yield finish(in_flight)
+
+
+_worker_basepath = "/"
+_worker_template = None
+_worker_cache = None
+_worker_assets = None
+
+
+# init_render_worker() and render_in_worker() are the initializer and page
+# renderer of a render process pool. from_path names the page in errors and
+# selects its PageHandler; paths without one are rendered as markdown.
+def init_render_worker(basepath, template_content, cache_size, assets=None):
+    global _worker_basepath, _worker_template, _worker_cache, _worker_assets
+    _worker_basepath = basepath
+    _worker_assets = assets
+    _worker_template = compile_template(template_content, basepath, assets)
+    if cache_size is not None:
+        from block_cache import BlockCache
+
+        _worker_cache = BlockCache(cache_size)
+
+
+def _render_worker_task(from_path):
+    try:
+        from_content = read_source(from_path)
+    except Exception as e:
+        raise Exception(f"failed to generate page from {from_path}: {e}") from None
+    return render_in_worker(from_path, from_content)
+
+
+def render_in_worker(from_path, from_content):
+    try:
+        return render_page(
+            _worker_basepath,
+            from_content,
+            _worker_template,
+            _worker_cache,
+            page_handler(from_path),
+            _worker_assets,
+        )
+    except Exception as e:
+        raise Exception(f"failed to generate page from {from_path}: {e}") from None
+
+
+# _render_content_task() renders a page read by the parent and also returns
+# the time the worker spent rendering it.
+def _render_content_task(from_path, from_content):
+    start = time.perf_counter()
+    text = render_in_worker(from_path, from_content)
+    return text, time.perf_counter() - start
+
+
+def remove_stale_outputs(manifest, dest_dir_path):
+    for dest_path in manifest.stale_outputs():
+        print(f"Removing stale page {dest_path}")
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+        manifest.forget(dest_path)
@@ -1,20 +1,126 @@
+import sys
+
+
+# Props is the attribute dict of a node. It caches its serialized form, which
+# every mutation invalidates, so a node rendered more than once (e.g. a cached
+# block, or a template value) only escapes and joins its attributes once.
+class Props(dict):
+    # Props has no __init__ of its own, so that it is constructed as fast as a
+    # dict; _attrs may be unset until attrs() first runs
+    __slots__ = ("_attrs",)
+
+    # attrs() returns the attributes as they follow the tag name: each one
+    # preceded by a space, with values escaped for a double-quoted attribute.
+    def attrs(self):
+        try:
+            attrs = self._attrs
+        except AttributeError:
+            attrs = None
+        if attrs is None:
+            attrs = "".join([f' {k}="{escape_attr(v)}"' for k, v in self.items()])
+            self._attrs = attrs
+        return attrs
+
+    def __setitem__(self, key, value):
+        self._attrs = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._attrs = None
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self._attrs = None
+        return super().__ior__(other)
+
+    def clear(self):
+        self._attrs = None
+        super().clear()
+
+    def pop(self, *args):
+        self._attrs = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._attrs = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._attrs = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._attrs = None
+        super().update(*args, **kwargs)
+
+
+# escape_attr() escapes a value for a double-quoted attribute. It avoids the
+# html module, whose import pulls in the whole entity table.
+def escape_attr(value):
+    value = str(value)
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    return value
+
+
+# Nodes use __slots__ instead of a per-instance __dict__, as whole-site trees
+# hold a very large number of them. Tags are interned, so that every node with
+# the same tag shares one string.
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "_props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
+        if tag is not None:
+            tag = sys.intern(tag)
         self.tag = tag
         self.value = value
         self.children = children
-        self.props = props
+        if props is not None and type(props) is not Props:
+            props = Props(props)
+            props._attrs = None
+        self._props = props
+
+    # props is stored as Props, so that assigned dicts cache their serialized
+    # attributes too.
+    @property
+    def props(self):
+        return self._props
+
+    @props.setter
+    def props(self, props):
+        if props is not None and not isinstance(props, Props):
+            props = Props(props)
+            props._attrs = None
+        self._props = props
 
     def to_html(self):
         raise NotImplementedError()
 
+    # iter_html() yields the serialized node as a sequence of string chunks
+    # that, joined, equal to_html().
+    def iter_html(self):
+        yield self.to_html()
+
+    # write_html() streams the serialized node into a text file object without
+    # building the whole document as one string.
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
-        if self.props is None:
+        if self._props is None:
             return ""
-        return " ".join([f'{k}="{self.props[k]}"' for k in self.props])
+        return self._props.attrs()[1:]
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -25,33 +131,69 @@ class LeafNode(HTMLNode):
         if self.tag is None:
             return f"{self.value}"
 
-        props_string = self.props_to_html()
-        if len(props_string) > 0:
-            props_string = " " + props_string
-
-        return f"<{self.tag}{props_string}>{self.value}</{self.tag}>"
+        if self._props is None:
+            return f"<{self.tag}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self._props.attrs()}>{self.value}</{self.tag}>"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
-        if self.tag is None:
-            raise ValueError("'tag' field cannot be None")
-        if self.children is None:
-            raise ValueError("'children' field cannot be None")
+        return "".join(self.iter_html())
 
-        props_string = self.props_to_html()
-        if len(props_string) > 0:
-            props_string = " " + props_string
+    # iter_html() walks the tree with an explicit stack rather than recursing
+    # through nested generators, so deep trees cost no extra frames per level.
+    # Closing tags are pushed on the stack as plain strings.
+    def iter_html(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+                continue
+            if not isinstance(node, ParentNode):
+                yield from node.iter_html()
+                continue
 
-        child_strings = [v.to_html() for v in self.children]
-        child_string = "".join(child_strings)
+            if node.tag is None:
+                raise ValueError("'tag' field cannot be None")
+            if node.children is None:
+                raise ValueError("'children' field cannot be None")
 
-        # TODO: replace above line with the following:
+            if node._props is None:
+                yield f"<{node.tag}>"
+            else:
+                yield f"<{node.tag}{node._props.attrs()}>"
+            stack.append(f"</{node.tag}>")
+            stack.extend(reversed(node.children))
+
+        # TODO: join children with newlines:
         # child_string = "\n".join(child_strings)
         # if len(child_string) > 0:
         #     child_string = "\n" + child_string + "\n"
 
-        return f"<{self.tag}{props_string}>{child_string}</{self.tag}>"
+
+# StreamNode is a parent node whose children are produced lazily by an
+# iterator, for documents too large to hold as a whole tree. As the iterator is
+# consumed while serializing, a StreamNode can only be serialized once.
+class StreamNode(HTMLNode):
+    __slots__ = ()
+
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        if self._props is None:
+            yield f"<{self.tag}>"
+        else:
+            yield f"<{self.tag}{self._props.attrs()}>"
+        for child in self.children:
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
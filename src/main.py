@@ -1,89 +1,290 @@
 import os
 import sys
-import shutil
-
-from extract_title import extract_title
-from to_html import markdown_to_html_node
-
-
-def main():
-    args = sys.argv
-    basepath = len(args) > 1 and args[1] or "/"
-
-    # assuming function is called from project root
-    src = "static"
-    dst = "docs"
-
-    if not os.path.exists(dst):
-        raise Exception(f"destination directory at {os.path.abspath(dst)} not found")
-
-    if not os.path.exists(src):
-        raise Exception(f"source directory at {os.path.abspath(src)} not found")
-
-    shutil.rmtree(dst)
-    os.mkdir(dst)
-    recursive_copy(src, dst)
-
-    generate_pages_recursive(basepath, "content", "template.html", dst)
-
-
-def recursive_copy(src, dst):
-    contents = os.listdir(src)
-    sub_content = lambda a, b: a + "/" + b
-    for content in contents:
-        sub_src = sub_content(src, content)
-        sub_dst = sub_content(dst, content)
-        if os.path.isdir(sub_src):
-            os.mkdir(sub_dst)
-            recursive_copy(sub_src, sub_dst)
-            continue
-        shutil.copy(sub_src, sub_dst)
-
-
-def generate_page(basepath, from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    from_content = ""
-    template_content = ""
-    with open(from_path, "r") as f:
-        from_content = f.read()
-    with open(template_path, "r") as f:
-        template_content = f.read()
-
-    html_node = markdown_to_html_node(from_content)
-    html = html_node.to_html()
-    title = extract_title(from_content)
-    text = template_content.replace("{{ Title }}", title)
-    text = text.replace("{{ Content }}", html)
-    text = text.replace('href="/', f'href="{basepath}')
-    text = text.replace('src="/', f'src="{basepath}')
-
-    dirs, _ = os.path.split(dest_path)
-    if len(dirs) > 0:
-        os.makedirs(dirs, exist_ok=True)
-    with open(dest_path, "w") as f:
-        f.write(text)
-
-
-def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path):
-    sub_content = lambda a, b: a + "/" + b
-
-    contents = os.listdir(dir_path_content)
-    for content in contents:
-        this_content_path = sub_content(dir_path_content, content)
-        if os.path.isdir(this_content_path):
-            generate_pages_recursive(
-                basepath,
-                this_content_path,
-                template_path,
-                sub_content(dest_dir_path, content),
-            )
-            continue
-        generate_page(
-            basepath,
-            sub_content(dir_path_content, content),
-            template_path,
-            sub_content(dest_dir_path, content.replace(".md", ".html")),
+
+# Importing this module does no work and imports nothing beyond the standard
+# library's core: the generator's modules are imported once a build actually
+# starts, so --version and --check return without paying for them.
+
+VERSION = "0.1.0"
+
+# assuming the generator is run from the project root
+CONTENT_DIR = "content"
+STATIC_DIR = "static"
+DEST_DIR = "docs"
+TEMPLATE_PATH = "template.html"
+
+
+def parse_args(argv=None):
+    import argparse
+
+    from fsutil import COPY_METHODS
+
+    parser = argparse.ArgumentParser(description="static site generator")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--version", action="version", version=f"static site generator {VERSION}"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only check that the project's directories and template are usable",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-render pages whose inputs changed since the last build",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_arg,
+        help="render only shard i of N (i/N) of the pages, into --shard-dir",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        help="output directory of --shard (default: docs-shard-<i>-of-<N>)",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="SHARD_DIR",
+        help="verify the output directories of all shards and merge them with "
+        "the static files into docs",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="print why each page is rendered or skipped, and which pages "
+        "reference changed static files",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="also copy static assets to content-hashed names and point pages "
+        "and the template at those",
+    )
+    parser.add_argument(
+        "--site-index",
+        action="store_true",
+        help="write the path, title and front matter of every page to "
+        "docs/site-index.json before rendering",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write a search index of the pages to docs/search-index "
+        "(not with --shard or --merge)",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed .gz (and .br with brotli installed) siblings "
+        "of the text files in docs, in --jobs threads",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--copy-method",
+        choices=COPY_METHODS,
+        default="copy",
+        help="how changed static files are placed in the destination",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes rendering pages in parallel (0: one per core)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=0,
+        help="threads reading sources and writing pages concurrently with "
+        "rendering (0: read and write inline)",
+    )
+    parser.add_argument(
+        "--io-depth",
+        type=int,
+        default=16,
+        help="with --io-threads, how many pages are read ahead of rendering "
+        "and how many rendered pages may wait to be written",
+    )
+    parser.add_argument(
+        "--block-cache",
+        action="store_true",
+        help="memoize the rendered HTML of identical blocks",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=10000,
+        help="number of blocks the block cache keeps in memory",
+    )
+    parser.add_argument(
+        "--block-cache-path",
+        help="sqlite file the block cache persists to between builds "
+        "(serial builds only)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report wall time and call counts per build stage and per page",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="number of slowest pages listed by --profile",
+    )
+    parser.add_argument(
+        "--trace",
+        help="with --profile, write a Chrome trace-event JSON file to this path",
+    )
+    args = parser.parse_args(argv)
+    # pool workers keep caches of their own, which never reach the sqlite file
+    if args.block_cache_path and args.jobs != 1 and not args.profile:
+        parser.error("--block-cache-path needs a serial build (--jobs 1)")
+    return args
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # fast paths that skip argparse and the generator's imports
+    if argv == ["--version"]:
+        print(f"static site generator {VERSION}")
+        return 0
+    if argv == ["--check"]:
+        return check()
+
+    args = parse_args(argv)
+    if args.check:
+        return check()
+    if not args.profile:
+        build(args)
+        return 0
+
+    import profiler
+
+    # spans are only collected in this process, so profiled builds are serial
+    if args.jobs != 1:
+        print("--profile renders pages serially, ignoring --jobs")
+        args.jobs = 1
+    prof = profiler.enable()
+    with profiler.stage("build"):
+        # imported ahead of build() so their load time is not unattributed
+        with profiler.stage("import"):
+            import block_cache
+            import builder
+        build(args)
+    profiler.disable()
+    print(prof.report(args.profile_top))
+    if args.trace:
+        prof.write_trace(args.trace)
+    return 0
+
+
+def shard_arg(text):
+    import argparse
+
+    from shard import parse_shard
+
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+# check() verifies, without building, that the content, static and
+# destination directories exist and that the template has the placeholders
+# pages are rendered with. Every problem is printed; returns the exit status.
+def check():
+    from template import compile_template
+
+    problems = []
+    for name, path in [
+        ("content", CONTENT_DIR),
+        ("source", STATIC_DIR),
+        ("destination", DEST_DIR),
+    ]:
+        if not os.path.isdir(path):
+            problems.append(f"{name} directory at {os.path.abspath(path)} not found")
+    if not os.path.isfile(TEMPLATE_PATH):
+        problems.append(f"template at {os.path.abspath(TEMPLATE_PATH)} not found")
+    else:
+        with open(TEMPLATE_PATH, "r") as f:
+            placeholders = compile_template(f.read()).placeholders()
+        for name in ["Title", "Content"]:
+            if name not in placeholders:
+                problems.append(f"template has no {{{{ {name} }}}} placeholder")
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        return 1
+    print("ok")
+    return 0
+
+
+def build(args):
+    from block_cache import BlockCache
+    from builder import Builder
+    from manifest import generator_hash
+
+    cache = None
+    if args.block_cache or args.block_cache_path:
+        cache = BlockCache(
+            args.block_cache_size, args.block_cache_path, generator_hash()
         )
 
+    builder = Builder(
+        content_dir=CONTENT_DIR,
+        static_dir=STATIC_DIR,
+        template_path=TEMPLATE_PATH,
+        dest_dir=DEST_DIR,
+        basepath=args.basepath,
+        jobs=args.jobs or os.cpu_count() or 1,
+        cache=cache,
+        io_threads=args.io_threads,
+        io_depth=args.io_depth,
+        fingerprint=args.fingerprint,
+        search=args.search_index,
+        site_index=args.site_index,
+    )
+    with builder:
+        if args.shard is not None:
+            builder.build_shard(
+                args.shard, args.shard_dir, args.incremental, args.explain
+            )
+        elif args.merge is not None:
+            builder.merge(args.merge, args.copy_method)
+        else:
+            builder.build(
+                args.incremental, args.checksum, args.copy_method, args.explain
+            )
+        # shard directories hold pages only; their merge is compressed
+        if args.compress and args.shard is None:
+            builder.compress()
+    report_block_cache(cache, builder.jobs)
+
+
+def report_block_cache(cache, jobs):
+    if cache is None:
+        return
+    if jobs > 1:
+        # pool workers keep their own caches, which are not reported
+        return
+    stats = cache.stats()
+    print(
+        f"Block cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, "
+        f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
+    )
+
 
-main()
+# process-pool workers may re-import this module (spawn start method), which
+# must not start another build
+if __name__ == "__main__":
+    sys.exit(main())
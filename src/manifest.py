@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 2
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# generator_hash() fingerprints the generator's own (non-test) modules, so that
+# a change to the code that produces the pages invalidates every output.
+def generator_hash(src_dir=None):
+    if src_dir is None:
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(src_dir)):
+        if not name.endswith(".py") or name.startswith("test_"):
+            continue
+        digest.update(name.encode())
+        with open(os.path.join(src_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Manifest is the build's dependency graph. It records, per output file, the
+# inputs it was rendered from (source, template, generator and basepath) and
+# the root-relative URLs of the assets and pages it references. An output is
+# fresh when the inputs it was rendered from are unchanged. References do not
+# make an output stale, as a page's HTML does not depend on the contents of
+# what it links to; they let a build explain which pages an asset change
+# touches and find broken references.
+class Manifest:
+    def __init__(self, path, generator="", template=""):
+        self.path = path
+        self.generator = generator
+        self.template = template
+        self.entries = {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path, generator, template):
+        manifest = cls(path, generator, template)
+        if not os.path.exists(path):
+            return manifest
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get("version") != MANIFEST_VERSION:
+            return manifest
+        manifest.entries = data.get("entries", {})
+        return manifest
+
+    def is_fresh(self, dest_path, source_hash, basepath, rendered=True, assets=None):
+        reason = self.why_stale(dest_path, source_hash, basepath, rendered, assets)
+        return reason is None
+
+    # why_stale() returns why dest_path has to be rendered again, or None when
+    # it is fresh. Outputs that are not rendered, but copied from their source,
+    # do not depend on the template or the basepath. assets are the
+    # fingerprinted URLs of the assets the page references, if any.
+    def why_stale(self, dest_path, source_hash, basepath, rendered=True, assets=None):
+        self.seen.add(dest_path)
+        entry = self.entries.get(dest_path)
+        if entry is None:
+            return "new page"
+        if not os.path.exists(dest_path):
+            return "output missing"
+        if entry["generator"] != self.generator:
+            return "generator changed"
+        if entry["source_hash"] != source_hash:
+            return "source changed"
+        if not rendered:
+            return None
+        if entry["template_hash"] != self.template:
+            return "template changed"
+        if entry["basepath"] != basepath:
+            return "basepath changed"
+        if entry.get("assets") != assets:
+            return "assets changed"
+        return None
+
+    def record(
+        self,
+        dest_path,
+        source_path,
+        source_hash,
+        basepath,
+        refs=None,
+        rendered=True,
+        assets=None,
+    ):
+        self.seen.add(dest_path)
+        self.entries[dest_path] = {
+            "source": source_path,
+            "source_hash": source_hash,
+            "template_hash": self.template if rendered else None,
+            "generator": self.generator,
+            "basepath": basepath,
+            "refs": [] if refs is None else refs,
+            "assets": assets,
+        }
+
+    # referenced_by() returns the outputs that reference url.
+    def referenced_by(self, url):
+        return sorted(d for d, e in self.entries.items() if url in e.get("refs", ()))
+
+    # stale_outputs() returns outputs recorded by a previous build that were
+    # not produced (or confirmed fresh) by the current one.
+    def stale_outputs(self):
+        return sorted(k for k in self.entries if k not in self.seen)
+
+    def forget(self, dest_path):
+        self.entries.pop(dest_path, None)
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "entries": self.entries,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,135 @@
+import json
+import os
+
+from extract_title import extract_html_title, extract_title
+
+METADATA_CACHE_NAME = ".metadata-cache.json"
+FRONT_MATTER_DELIMITER = "---"
+# bytes read from the start of a source to find its header; sources whose
+# header does not fit are read in full
+HEADER_LIMIT = 16384
+
+
+# split_front_matter() splits the lines of a markdown page into its front
+# matter, the 'key: value' lines between a first line of '---' and the next
+# '---' line, and the remaining lines. Pages without front matter have an
+# empty one. Raises when the front matter is not closed.
+def split_front_matter(lines):
+    if not lines or lines[0].rstrip() != FRONT_MATTER_DELIMITER:
+        return {}, lines
+    for end in range(1, len(lines)):
+        if lines[end].rstrip() == FRONT_MATTER_DELIMITER:
+            return parse_front_matter(lines[1:end]), lines[end + 1 :]
+    raise Exception("front matter is not closed by a '---' line")
+
+
+def parse_front_matter(lines):
+    metadata = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            raise Exception(f"front matter line '{line}' is not 'key: value'")
+        metadata[key.strip()] = value.strip()
+    return metadata
+
+
+# separate_front_matter() returns the front matter of a markdown page and the
+# page without it.
+def separate_front_matter(markdown):
+    if not markdown.startswith(FRONT_MATTER_DELIMITER):
+        return {}, markdown
+    metadata, lines = split_front_matter(markdown.split("\n"))
+    return metadata, "\n".join(lines)
+
+
+# strip_front_matter() returns a markdown page without its front matter.
+def strip_front_matter(markdown):
+    return separate_front_matter(markdown)[1]
+
+
+# read_front_matter() reads the front matter off an open markdown file, if
+# there is one, and returns it with the first line after it.
+def read_front_matter(fp):
+    line = fp.readline()
+    if line.rstrip() != FRONT_MATTER_DELIMITER:
+        return {}, line
+    lines = []
+    for line in fp:
+        if line.rstrip() == FRONT_MATTER_DELIMITER:
+            return parse_front_matter(lines), fp.readline()
+        lines.append(line.rstrip("\n"))
+    raise Exception("front matter is not closed by a '---' line")
+
+
+# markdown_header() returns the title and front matter of a markdown page
+# from the start of its text.
+def markdown_header(text):
+    metadata, lines = split_front_matter(text.split("\n"))
+    return extract_title(lines[0] if lines else ""), metadata
+
+
+def html_header(text):
+    return extract_html_title(text), {}
+
+
+# read_header() parses the header of the source at path with parse(text),
+# reading at most limit bytes of it when the header lies within them.
+def read_header(path, parse, limit=HEADER_LIMIT):
+    with open(path, "rb") as f:
+        head = f.read(limit)
+        if len(head) == limit and f.read(1):
+            # only parse complete lines, never a partial character
+            head = head[: head.rfind(b"\n") + 1]
+            try:
+                return parse(head.decode("utf-8"))
+            except Exception:
+                f.seek(0)
+                head = f.read()
+    return parse(head.decode("utf-8"))
+
+
+# MetadataCache keeps the header of every scanned source, keyed on its path
+# and valid for as long as the source's mtime and size are unchanged.
+class MetadataCache:
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        cache = cls(path)
+        try:
+            with open(path, "r") as f:
+                cache.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+        return cache
+
+    # header() returns (title, metadata) of the source at path, parsing it
+    # with parse() unless the cached header is still valid.
+    def header(self, path, parse):
+        stat = os.stat(path)
+        version = [stat.st_mtime_ns, stat.st_size]
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1], entry[2]
+        self.misses += 1
+        title, metadata = read_header(path, parse)
+        self.entries[path] = [version, title, metadata]
+        return title, metadata
+
+    # retain() drops the entries of sources that are not in paths.
+    def retain(self, paths):
+        paths = set(paths)
+        self.entries = {p: e for p, e in self.entries.items() if p in paths}
+
+    def save(self):
+        if self.path is None:
+            return
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
@@ -0,0 +1,185 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The pipelined build overlaps file I/O with rendering. A pool of reader
+# threads prefetches sources ahead of the render stage, and a pool of writer
+# threads flushes rendered outputs behind it. The queues between the stages
+# are bounded, which caps how far the readers run ahead and how many rendered
+# outputs wait in memory.
+
+_DONE = object()
+
+
+# StageStats accumulates the busy time of a stage's workers. Utilisation is
+# the fraction of the pipeline's wall time the workers spent busy.
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, elapsed):
+        with self.lock:
+            self.items += 1
+            self.busy += elapsed
+
+    def utilisation(self, wall):
+        if wall <= 0:
+            return 0.0
+        return self.busy / (wall * self.workers)
+
+
+# QueueStats samples the depth of a queue each time an item enters or leaves
+# it.
+class QueueStats:
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self.samples = 0
+        self.total = 0
+        self.max = 0
+
+    def sample(self, depth):
+        self.samples += 1
+        self.total += depth
+        self.max = max(self.max, depth)
+
+    def mean(self):
+        return self.total / self.samples if self.samples else 0.0
+
+
+class PipelineStats:
+    def __init__(self, readers, renderers, writers, depth):
+        self.stages = [
+            StageStats("read", readers),
+            StageStats("render", renderers),
+            StageStats("write", writers),
+        ]
+        self.queues = [QueueStats("read", depth), QueueStats("write", depth)]
+        self.read_wait = 0.0
+        self.wall = 0.0
+
+    def stage(self, name):
+        return next(stage for stage in self.stages if stage.name == name)
+
+    def queue(self, name):
+        return next(q for q in self.queues if q.name == name)
+
+    def report(self):
+        lines = [f"{'stage':<8} {'workers':>8} {'items':>8} {'utilisation':>12}"]
+        for s in self.stages:
+            lines.append(
+                f"{s.name:<8} {s.workers:>8} {s.items:>8} "
+                f"{s.utilisation(self.wall):>12.1%}"
+            )
+        lines.append(f"{'queue':<8} {'capacity':>8} {'mean':>8} {'max':>12}")
+        for q in self.queues:
+            lines.append(f"{q.name:<8} {q.capacity:>8} {q.mean():>8.2f} {q.max:>12}")
+        lines.append(
+            f"wall {self.wall * 1e3:.3f} ms, "
+            f"render blocked on reads {self.read_wait * 1e3:.3f} ms"
+        )
+        return "\n".join(lines)
+
+
+# run_pipeline() reads every item with read(item) on reader threads, passes
+# the (item, data) pairs in order to render(inputs, stats), which yields
+# (item, output) pairs on the calling thread, and hands those to write(item,
+# output) on writer threads. render is responsible for recording its own busy
+# time in stats.stage("render"). Once everything is written, (item, result of
+# write) pairs are returned in render order; the first error of any stage is
+# raised.
+def run_pipeline(items, read, render, write, readers=4, writers=4, depth=16):
+    stats = PipelineStats(readers, 1, writers, depth)
+    start = time.perf_counter()
+    write_queue = queue.Queue(maxsize=depth)
+    results = {}
+    errors = []
+    threads = [
+        threading.Thread(
+            target=_write_worker,
+            args=(write_queue, write, stats.stage("write"), results, errors),
+            daemon=True,
+        )
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    rendered = []
+    pool = ThreadPoolExecutor(readers, thread_name_prefix="read")
+    try:
+        inputs = _prefetch(pool, items, read, depth, stats)
+        for item, output in render(inputs, stats):
+            if errors:
+                break
+            write_queue.put((len(rendered), item, output))
+            stats.queue("write").sample(write_queue.qsize())
+            rendered.append(item)
+    finally:
+        pool.shutdown(cancel_futures=True)
+        for _ in threads:
+            write_queue.put(None)
+        for thread in threads:
+            thread.join()
+        stats.wall = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return [(item, results[i]) for i, item in enumerate(rendered)], stats
+
+
+# _prefetch() keeps up to depth reads in flight and yields their results in
+# submission order. Time the render stage spends blocked on a read is added to
+# stats.read_wait.
+def _prefetch(pool, items, read, depth, stats):
+    read_stats = stats.stage("read")
+    read_queue = stats.queue("read")
+
+    def timed_read(item):
+        start = time.perf_counter()
+        data = read(item)
+        read_stats.add(time.perf_counter() - start)
+        return data
+
+    items = iter(items)
+    pending = collections.deque()
+
+    def submit():
+        item = next(items, _DONE)
+        if item is not _DONE:
+            pending.append((item, pool.submit(timed_read, item)))
+
+    for _ in range(depth):
+        submit()
+    while pending:
+        read_queue.sample(sum(1 for _, future in pending if future.done()))
+        item, future = pending.popleft()
+        start = time.perf_counter()
+        data = future.result()
+        stats.read_wait += time.perf_counter() - start
+        submit()
+        yield item, data
+
+
+def _write_worker(write_queue, write, stats, results, errors):
+    while True:
+        job = write_queue.get()
+        if job is None:
+            return
+        if errors:
+            # drain the queue so the render stage is never blocked
+            continue
+        index, item, output = job
+        start = time.perf_counter()
+        try:
+            results[index] = write(item, output)
+        except Exception as e:
+            errors.append(e)
+            continue
+        stats.add(time.perf_counter() - start)
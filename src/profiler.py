@@ -0,0 +1,145 @@
+import os
+import time
+
+# The build is instrumented with stage() and page() spans. While profiling is
+# disabled both return the same do-nothing context manager, so instrumented
+# code pays a function call and nothing else.
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+# STAGE_NOTES explain, below the report, the stages that cover more than their
+# name says.
+STAGE_NOTES = {
+    "import": "loading the generator's modules",
+    "template": "loading the compiled template",
+    "read": "reading page sources; pipelined builds read on I/O threads instead",
+    "serialize": "HTML serialization and template substitution, parsing excluded",
+    "write": "writing pages; pipelined builds write on I/O threads instead",
+}
+_profiler = None
+
+
+def enable():
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def is_enabled():
+    return _profiler is not None
+
+
+def stage(name):
+    if _profiler is None:
+        return _NULL_SPAN
+    return _Span(_profiler, name, None)
+
+
+def page(path):
+    if _profiler is None:
+        return _NULL_SPAN
+    return _Span(_profiler, "page", path)
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "page", "start", "child_time")
+
+    def __init__(self, profiler, name, page):
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+
+    def __enter__(self):
+        self.child_time = 0.0
+        self.profiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler.stack.pop()
+        self.profiler.record(self, end)
+        return False
+
+
+# Profiler aggregates wall time and call counts per stage and per page, and
+# keeps every span as a trace event. A stage's self time excludes the time
+# spent in stages nested inside it.
+class Profiler:
+    def __init__(self):
+        import threading
+
+        self.get_ident = threading.get_ident
+        self.origin = time.perf_counter()
+        self.stack = []
+        self.stages = {}
+        self.pages = {}
+        self.events = []
+
+    def record(self, span, end):
+        elapsed = end - span.start
+        if self.stack:
+            self.stack[-1].child_time += elapsed
+
+        if span.page is not None:
+            self.pages[span.page] = self.pages.get(span.page, 0.0) + elapsed
+        else:
+            calls, total, self_time = self.stages.get(span.name, (0, 0.0, 0.0))
+            self.stages[span.name] = (
+                calls + 1,
+                total + elapsed,
+                self_time + elapsed - span.child_time,
+            )
+
+        event = {
+            "name": span.page if span.page is not None else span.name,
+            "cat": span.name,
+            "ph": "X",
+            "ts": round((span.start - self.origin) * 1e6, 3),
+            "dur": round(elapsed * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": self.get_ident(),
+        }
+        self.events.append(event)
+
+    def slowest_pages(self, top=10):
+        return sorted(self.pages.items(), key=lambda x: x[1], reverse=True)[:top]
+
+    def report(self, top=10):
+        lines = [f"{'stage':<16} {'calls':>8} {'total ms':>12} {'self ms':>12}"]
+        by_self_time = sorted(self.stages.items(), key=lambda x: x[1][2], reverse=True)
+        for name, (calls, total, self_time) in by_self_time:
+            lines.append(
+                f"{name:<16} {calls:>8} {total * 1e3:>12.3f} {self_time * 1e3:>12.3f}"
+            )
+        notes = [name for name in STAGE_NOTES if name in self.stages]
+        if notes:
+            lines.append("")
+            for name in notes:
+                lines.append(f"{name}: {STAGE_NOTES[name]}")
+        lines.append("")
+        lines.append(f"slowest {top} pages:")
+        for path, elapsed in self.slowest_pages(top):
+            lines.append(f"{elapsed * 1e3:>10.3f} ms  {path}")
+        return "\n".join(lines)
+
+    # write_trace() dumps every span in the Chrome trace-event format, which
+    # chrome://tracing and Perfetto can load.
+    def write_trace(self, path):
+        import json
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,49 @@
+import os
+import re
+
+from blocks import BlockType, iter_blocks
+from textnode import iter_link_spans
+
+HTML_REFERENCE_REGEX = re.compile(r'(?:href|src)="(/[^"]*)"')
+
+
+# find_references() returns the root-relative URLs a markdown page links to or
+# embeds, in order of first appearance, without query string or fragment.
+# Links inside code blocks are not references.
+def find_references(markdown):
+    refs = {}
+    for block_type, lines in iter_blocks(markdown.split("\n")):
+        if block_type == BlockType.CODE:
+            continue
+        # LINK_REGEX also matches the bracketed part of an image
+        for _, _, _, url in iter_link_spans("\n".join(lines)):
+            if not url.startswith("/") or url.startswith("//"):
+                continue
+            refs[strip_query(url)] = None
+    return list(refs)
+
+
+# find_html_references() is find_references() for an HTML fragment, taking the
+# root-relative URLs of its href and src attributes.
+def find_html_references(html):
+    refs = {}
+    for match in HTML_REFERENCE_REGEX.finditer(html):
+        if not match[1].startswith("//"):
+            refs[strip_query(match[1])] = None
+    return list(refs)
+
+
+def strip_query(url):
+    return url.split("#", 1)[0].split("?", 1)[0]
+
+
+# reference_target() returns the file under dest_dir that url is served from,
+# or None when nothing is there. A URL of a directory is served from its
+# index.html.
+def reference_target(url, dest_dir):
+    path = os.path.join(dest_dir, url.lstrip("/"))
+    if os.path.isdir(path):
+        path = os.path.join(path, "index.html")
+    if os.path.isfile(path):
+        return path
+    return None
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+
+from blocks import BlockType, iter_blocks
+from extract_title import extract_html_title, extract_title
+from fsutil import write_if_changed
+from metadata import strip_front_matter
+from textnode import text_to_textnodes
+
+SEARCH_STATE_NAME = ".search-index.json"
+SEARCH_DIR_NAME = "search-index"
+SEARCH_STATE_VERSION = 1
+# terms are grouped into chunk files by their first PREFIX_LENGTH characters,
+# so a client only fetches the chunk of the prefix being searched for
+PREFIX_LENGTH = 2
+HEADING_WEIGHT = 4
+
+TERM_REGEX = re.compile(r"[^\W_]{2,}")
+HTML_HEADING_REGEX = re.compile(r"<h[1-6](?:\s[^>]*)?>(.*?)</h[1-6]>", re.DOTALL)
+HTML_TAG_REGEX = re.compile(r"<[^>]*>")
+
+
+# add_terms() adds weight to the frequency of every term of text: lowercased
+# runs of at least two letters or digits.
+def add_terms(terms, text, weight):
+    for term in TERM_REGEX.findall(text.lower()):
+        terms[term] = terms.get(term, 0) + weight
+
+
+# markdown_document() returns the title and the weighted term frequencies of a
+# markdown page. Terms are taken from the TextNodes of every block's inline
+# markdown, as text_to_textnodes() produces them for rendering, so link and
+# image URLs and the markup itself are not indexed. Headings count
+# HEADING_WEIGHT times; code blocks are not indexed.
+def markdown_document(markdown):
+    markdown = strip_front_matter(markdown)
+    terms = {}
+    for block_type, lines in iter_blocks(markdown.split("\n")):
+        if block_type == BlockType.CODE:
+            continue
+        weight = HEADING_WEIGHT if block_type == BlockType.HEADING else 1
+        if block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+            texts = lines
+        else:
+            texts = [" ".join(lines)]
+        for text in texts:
+            for node in text_to_textnodes(text):
+                add_terms(terms, node.text, weight)
+    return extract_title(markdown), terms
+
+
+# html_document() is markdown_document() for an HTML fragment: the text
+# between its tags is indexed, with the text of its headings boosted.
+def html_document(html):
+    terms = {}
+    for match in HTML_HEADING_REGEX.finditer(html):
+        add_terms(terms, HTML_TAG_REGEX.sub(" ", match[1]), HEADING_WEIGHT - 1)
+    add_terms(terms, HTML_TAG_REGEX.sub(" ", html), 1)
+    return extract_html_title(html), terms
+
+
+# page_url() is the URL dest_path is served at, below basepath.
+def page_url(dest_path, dest_dir, basepath):
+    rel_path = os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+    if rel_path == "index.html":
+        rel_path = ""
+    elif rel_path.endswith("/index.html"):
+        rel_path = rel_path[: -len("index.html")]
+    return basepath + rel_path
+
+
+# SearchIndex is an inverted index of the site's pages for a client-side
+# search. It is written to SEARCH_DIR_NAME in the output directory as compact
+# JSON: pages.json lists every page's id, URL and title and the chunks that
+# exist, and <prefix>.json maps each term starting with prefix to a flat list
+# of [page id, weighted frequency, ...] pairs. The term frequencies and the
+# source hash of every page are kept in SEARCH_STATE_NAME, so that a build only
+# re-indexes the pages whose source changed and only rewrites the chunks their
+# terms fall into.
+class SearchIndex:
+    def __init__(self, dest_dir, basepath):
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.pages = {}
+        self.next_id = 0
+        self.dirty = set()
+        self.reset = True
+
+    @classmethod
+    def load(cls, dest_dir, basepath):
+        index = cls(dest_dir, basepath)
+        try:
+            with open(os.path.join(dest_dir, SEARCH_STATE_NAME), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if data.get("version") != SEARCH_STATE_VERSION:
+            return index
+        if data.get("basepath") != basepath:
+            return index
+        index.pages = data["pages"]
+        index.next_id = data["next_id"]
+        index.reset = False
+        return index
+
+    def has(self, url):
+        return url in self.pages
+
+    # source_hash() returns the hash of the source the page at url was indexed
+    # from, or None when it is not indexed.
+    def source_hash(self, url):
+        page = self.pages.get(url)
+        return None if page is None else page.get("source_hash")
+
+    # update() replaces the title and terms of the page at url, indexed from
+    # the source with source_hash.
+    def update(self, url, title, terms, source_hash=None):
+        page = self.pages.get(url)
+        if page is None:
+            page = {"id": self.next_id}
+            self.next_id += 1
+            self.pages[url] = page
+        else:
+            self.mark_dirty(page["terms"])
+        page["title"] = title
+        page["terms"] = terms
+        page["source_hash"] = source_hash
+        self.mark_dirty(terms)
+
+    # retain() drops every page whose URL is not in urls.
+    def retain(self, urls):
+        for url in self.pages.keys() - set(urls):
+            self.mark_dirty(self.pages.pop(url)["terms"])
+
+    def mark_dirty(self, terms):
+        self.dirty.update(term[:PREFIX_LENGTH] for term in terms)
+
+    # save() writes the chunks of the prefixes whose terms changed, the page
+    # list and the state. Returns the number of chunk files written or removed.
+    def save(self):
+        out_dir = os.path.join(self.dest_dir, SEARCH_DIR_NAME)
+        if self.reset:
+            import shutil
+
+            shutil.rmtree(out_dir, ignore_errors=True)
+            self.dirty = {
+                term[:PREFIX_LENGTH]
+                for page in self.pages.values()
+                for term in page["terms"]
+            }
+        os.makedirs(out_dir, exist_ok=True)
+
+        chunks = {prefix: {} for prefix in self.dirty}
+        prefixes = set()
+        for page in sorted(self.pages.values(), key=lambda page: page["id"]):
+            for term, weight in page["terms"].items():
+                prefix = term[:PREFIX_LENGTH]
+                prefixes.add(prefix)
+                if prefix in chunks:
+                    chunks[prefix].setdefault(term, []).extend([page["id"], weight])
+
+        changed = 0
+        for prefix, postings in chunks.items():
+            path = os.path.join(out_dir, f"{prefix}.json")
+            if not postings:
+                if os.path.exists(path):
+                    os.remove(path)
+                    changed += 1
+                continue
+            changed += write_if_changed(path, compact_json(postings))
+
+        listing = {
+            "prefix_length": PREFIX_LENGTH,
+            "chunks": sorted(prefixes),
+            "pages": {
+                page["id"]: [url, page["title"]]
+                for url, page in sorted(self.pages.items())
+            },
+        }
+        write_if_changed(os.path.join(out_dir, "pages.json"), compact_json(listing))
+        state = {
+            "version": SEARCH_STATE_VERSION,
+            "basepath": self.basepath,
+            "next_id": self.next_id,
+            "pages": self.pages,
+        }
+        with open(os.path.join(self.dest_dir, SEARCH_STATE_NAME), "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        self.dirty = set()
+        self.reset = False
+        return changed
+
+
+def compact_json(data):
+    return json.dumps(
+        data, separators=(",", ":"), sort_keys=True, ensure_ascii=False
+    ).encode("utf-8")
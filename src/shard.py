@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+
+from fsutil import copy_file
+
+SHARD_MANIFEST_NAME = ".shard.json"
+
+
+# parse_shard() parses "i/N", shard i (counting from 1) of N, into (i, N).
+def parse_shard(text):
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"invalid shard '{text}', expected i/N") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard '{text}', expected 1 <= i <= N")
+    return index, count
+
+
+def shard_dir_name(shard):
+    index, count = shard
+    return f"docs-shard-{index}-of-{count}"
+
+
+# shard_of() assigns a page to one of count shards by a hash of its path
+# relative to the content directory, which is the same on every machine and
+# does not depend on which other pages exist.
+def shard_of(rel_path, count):
+    digest = hashlib.sha256(rel_path.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+# select_shard() keeps the (source, output) pairs of the pages in shard.
+def select_shard(pages, content_dir, shard):
+    index, count = shard
+    for from_path, dest_path in pages:
+        rel_path = os.path.relpath(from_path, content_dir).replace(os.sep, "/")
+        if shard_of(rel_path, count) == index:
+            yield from_path, dest_path
+
+
+# write_shard_manifest() records what a shard build produced: which shard it
+# is, the inputs it was built with, and its pages relative to out_dir.
+def write_shard_manifest(out_dir, shard, build_info, pages):
+    index, count = shard
+    data = {
+        "index": index,
+        "count": count,
+        "build": build_info,
+        "pages": sorted(os.path.relpath(dest, out_dir) for _, dest in pages),
+    }
+    with open(os.path.join(out_dir, SHARD_MANIFEST_NAME), "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def load_shard_manifest(shard_dir):
+    path = os.path.join(shard_dir, SHARD_MANIFEST_NAME)
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise Exception(f"no shard manifest in {shard_dir}: {e}") from None
+
+
+# verify_shards() checks that the shard directories are all N shards of one
+# build, made with the same inputs (and with build_info, the inputs of the
+# merging build, when given), and that every expected page (output path
+# relative to the merged tree) was produced by exactly one of them. Every
+# problem found is raised at once. Returns the shard directory of each page.
+def verify_shards(shard_dirs, expected_pages, build_info=None):
+    problems = []
+    owners = {}
+    manifests = [
+        (shard_dir, load_shard_manifest(shard_dir)) for shard_dir in shard_dirs
+    ]
+
+    counts = {m["count"] for _, m in manifests}
+    builds = {json.dumps(m["build"], sort_keys=True) for _, m in manifests}
+    indices = sorted(m["index"] for _, m in manifests)
+    if len(counts) != 1:
+        problems.append(f"shards of different builds: counts {sorted(counts)}")
+    elif indices != list(range(1, counts.pop() + 1)):
+        problems.append(f"shards missing or repeated: got {indices}")
+    if len(builds) != 1:
+        problems.append("shards were built from different inputs or options")
+    elif build_info is not None:
+        build = manifests[0][1]["build"]
+        for key, value in sorted(build_info.items()):
+            if build.get(key) != value:
+                problems.append(
+                    f"shards were built with {key} {build.get(key)!r}, "
+                    f"the merge with {value!r}"
+                )
+
+    for shard_dir, manifest in manifests:
+        listed = set(manifest["pages"])
+        for rel_path in manifest["pages"]:
+            if not os.path.isfile(os.path.join(shard_dir, rel_path)):
+                problems.append(f"{shard_dir} lacks its page {rel_path}")
+            if rel_path in owners:
+                problems.append(
+                    f"{rel_path} produced by both {owners[rel_path]} and {shard_dir}"
+                )
+            owners[rel_path] = shard_dir
+        for rel_path in walk_outputs(shard_dir):
+            if rel_path not in listed:
+                problems.append(f"{shard_dir} has unexpected file {rel_path}")
+
+    for rel_path in sorted(set(expected_pages) - owners.keys()):
+        problems.append(f"no shard produced {rel_path}")
+    for rel_path in sorted(owners.keys() - set(expected_pages)):
+        problems.append(f"{owners[rel_path]} produced {rel_path}, which has no source")
+
+    if problems:
+        raise Exception("cannot merge shards:\n  " + "\n  ".join(problems))
+    return owners
+
+
+def copy_shard_pages(owners, dest_dir, method="copy"):
+    for rel_path, shard_dir in sorted(owners.items()):
+        dest_path = os.path.join(dest_dir, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(os.path.join(shard_dir, rel_path), dest_path, method)
+
+
+# walk_outputs() lists the files under shard_dir relative to it, skipping the
+# build's own dotfiles (manifests).
+def walk_outputs(shard_dir):
+    for dir_path, dir_names, file_names in os.walk(shard_dir):
+        for file_name in file_names:
+            if file_name.startswith("."):
+                continue
+            yield os.path.relpath(os.path.join(dir_path, file_name), shard_dir)
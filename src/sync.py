@@ -0,0 +1,97 @@
+import json
+import os
+
+from fsutil import copy_file, remove_empty_dirs
+from manifest import hash_file
+
+SYNC_MANIFEST_NAME = ".static-manifest.json"
+
+
+class SyncStats:
+    def __init__(self):
+        self.copied = 0
+        self.skipped = 0
+        self.removed = 0
+        self.bytes_copied = 0
+        # paths relative to the synced directories
+        self.copied_files = []
+        self.removed_files = []
+
+    def __repr__(self):
+        return (
+            f"SyncStats(copied={self.copied}, skipped={self.skipped}, "
+            f"removed={self.removed}, bytes_copied={self.bytes_copied})"
+        )
+
+
+# sync_tree() makes the files under src present and up to date under dst,
+# copying only files whose size or mtime differ (or, with checksum, whose
+# content hash differs). Files that a previous sync placed in dst but that no
+# longer exist in src are removed; other files in dst, such as generated
+# pages, are left alone. The list of synced files is kept in dst, under
+# SYNC_MANIFEST_NAME.
+def sync_tree(src, dst, checksum=False, method="copy"):
+    stats = SyncStats()
+    manifest_path = os.path.join(dst, SYNC_MANIFEST_NAME)
+    previous = load_synced_files(manifest_path)
+
+    current = []
+    for rel_path in walk_files(src):
+        current.append(rel_path)
+        src_path = os.path.join(src, rel_path)
+        dst_path = os.path.join(dst, rel_path)
+        if is_up_to_date(src_path, dst_path, checksum):
+            stats.skipped += 1
+            continue
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        stats.bytes_copied += copy_file(src_path, dst_path, method)
+        stats.copied += 1
+        stats.copied_files.append(rel_path)
+
+    for rel_path in sorted(set(previous) - set(current)):
+        dst_path = os.path.join(dst, rel_path)
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+            stats.removed += 1
+            stats.removed_files.append(rel_path)
+        remove_empty_dirs(os.path.dirname(dst_path), dst)
+
+    save_synced_files(manifest_path, current)
+    return stats
+
+
+def walk_files(root):
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            yield os.path.relpath(os.path.join(dir_path, file_name), root)
+
+
+def is_up_to_date(src_path, dst_path, checksum):
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src_path)
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(src_path) == hash_file(dst_path)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def load_synced_files(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_synced_files(path, files):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(files, f, indent=1)
+    os.replace(tmp_path, path)
@@ -0,0 +1,99 @@
+import os
+import re
+
+PLACEHOLDER_REGEX = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+REBASE_REGEX = re.compile(r'(href|src)="/')
+URL_ATTR_REGEX = re.compile(r'(href|src)="(/[^"]*)"')
+
+
+# Template is a template that has been parsed once into literal segments and
+# placeholder slots. Rendering fills the slots and joins the segments in a
+# single pass, so the rendered values are never scanned again. Values are
+# either strings or HTML nodes; nodes are serialized in place.
+class Template:
+    def __init__(self, parts, slots):
+        self.parts = parts
+        self.slots = slots
+
+    def placeholders(self):
+        return [name for _, name in self.slots]
+
+    def render(self, values):
+        parts = self.parts.copy()
+        for idx, name in self.slots:
+            value = self.value(values, name)
+            parts[idx] = value if isinstance(value, str) else value.to_html()
+        return "".join(parts)
+
+    # write() streams the rendered template into a text file object. Node
+    # values are written chunk by chunk and never joined into one string.
+    def write(self, fp, values):
+        slot_names = dict(self.slots)
+        for idx, part in enumerate(self.parts):
+            if part is not None:
+                fp.write(part)
+                continue
+            value = self.value(values, slot_names[idx])
+            if isinstance(value, str):
+                fp.write(value)
+            else:
+                value.write_html(fp)
+
+    def value(self, values, name):
+        if name not in values:
+            raise Exception(f"no value for template placeholder '{name}'")
+        return values[name]
+
+
+# compile_template() splits text on '{{ Name }}' placeholders. Root-relative
+# 'href' and 'src' attributes in the template's own literals are rewritten to
+# the basepath (and fingerprinted assets) here, once, instead of on every
+# rendered page.
+def compile_template(text, basepath="/", assets=None):
+    parts, slots = [], []
+    pos = 0
+    for match in PLACEHOLDER_REGEX.finditer(text):
+        parts.append(rebase_literal(text[pos : match.start()], basepath, assets))
+        slots.append((len(parts), match.group(1)))
+        parts.append(None)
+        pos = match.end()
+    parts.append(rebase_literal(text[pos:], basepath, assets))
+    return Template(parts, slots)
+
+
+def rebase_literal(text, basepath, assets=None):
+    if assets is not None:
+        return URL_ATTR_REGEX.sub(
+            lambda m: f'{m.group(1)}="{rebase_url(m.group(2), basepath, assets)}"',
+            text,
+        )
+    if basepath == "/":
+        return text
+    return REBASE_REGEX.sub(lambda m: f'{m.group(1)}="{basepath}', text)
+
+
+# rebase_url() rewrites a root-relative url to the basepath and, with assets
+# (a fingerprint.AssetMap), to the fingerprinted copy of the asset it names.
+# Both rewrites happen in the one pass over the page's URLs.
+def rebase_url(url, basepath, assets=None):
+    if assets is not None:
+        url = assets.rewrite(url)
+    return basepath + url[1:]
+
+
+_template_cache = {}
+
+
+# load_template() reads and compiles the template at path, reusing the compiled
+# template for as long as the file is unchanged on disk.
+def load_template(path, basepath="/", assets=None):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), basepath, assets and assets.digest)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, "r") as f:
+        template = compile_template(f.read(), basepath, assets)
+    _template_cache[key] = (version, template)
+    return template
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from blocks import BlockType, block_to_block_type, markdown_to_blocks
+from blocks import BlockType, block_to_block_type, iter_blocks, markdown_to_blocks
 
 
 class BlockTest(unittest.TestCase):
@@ -134,3 +135,20 @@ and finally the rest
         for block in false_lists:
             res = block_to_block_type(block)
             self.assertEqual(res, BlockType.PARAGRAPH)
+
+    def test_iter_blocks_from_file(self):
+        fp = io.StringIO(
+            "  # heading\n\n> quote 1\n> quote 2\n\n\n\n"
+            "```\ncode\n\n```\n\n1. one\n2. two  \n \n\n   \n"
+        )
+        res = list(iter_blocks(fp))
+        self.assertListEqual(
+            [
+                (BlockType.HEADING, ["# heading"]),
+                (BlockType.QUOTE, ["> quote 1", "> quote 2"]),
+                (BlockType.PARAGRAPH, ["```", "code"]),
+                (BlockType.PARAGRAPH, ["```"]),
+                (BlockType.ORDERED_LIST, ["1. one", "2. two"]),
+            ],
+            res,
+        )
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from block_cache import BlockCache
+from blocks import BlockType
+from generate import rebase_transform
+from to_html import markdown_to_html_node
+
+MARKDOWN = """# Title
+
+A [link](/page) and ![image](/img.png).
+
+- one
+- two
+
+A [link](/page) and ![image](/img.png)."""
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_key_depends_on_type_text_and_namespace(self):
+        key = BlockCache.key(BlockType.PARAGRAPH, ["a", "b"])
+        self.assertEqual(key, BlockCache.key(BlockType.PARAGRAPH, ["a", "b"]))
+        self.assertNotEqual(key, BlockCache.key(BlockType.PARAGRAPH, ["a b"]))
+        self.assertNotEqual(key, BlockCache.key(BlockType.HEADING, ["a", "b"]))
+        self.assertNotEqual(key, BlockCache.key(BlockType.PARAGRAPH, ["a", "b"], "/x/"))
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        self.assertEqual(cache.get("c"), "<p>c</p>")
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 2)
+
+    def test_same_html_as_uncached(self):
+        cache = BlockCache()
+        for basepath in ["/", "/base/"]:
+            expected = markdown_to_html_node(
+                MARKDOWN, rebase_transform(basepath)
+            ).to_html()
+            for _ in range(2):
+                html = markdown_to_html_node(
+                    MARKDOWN, rebase_transform(basepath), cache, basepath
+                ).to_html()
+                self.assertEqual(html, expected)
+        self.assertIn('href="/base/page"', html)
+        stats = cache.stats()
+        self.assertEqual(stats["misses"], 6)
+        self.assertEqual(stats["hits"], 10)
+
+    def test_persists_to_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.sqlite")
+            cache = BlockCache(path=path, version="v1")
+            cache.put("a", "<p>a</p>")
+            cache.close()
+
+            cache = BlockCache(path=path, version="v1")
+            self.assertEqual(cache.get("a"), "<p>a</p>")
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+            cache.close()
+
+            cache = BlockCache(path=path, version="v2")
+            self.assertIsNone(cache.get("a"))
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from block_cache import BlockCache
+from builder import Builder
+from fingerprint import ASSET_MANIFEST_NAME
+
+
+class TestBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dst = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        for path in [self.content, self.static, self.dst]:
+            os.makedirs(path)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[a](/a)")
+        self.write(os.path.join(self.static, "style.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def builder(self, **options):
+        return Builder(
+            self.content, self.static, self.template, self.dst, "/base/", **options
+        )
+
+    def test_render(self):
+        with self.builder(cache=BlockCache()) as builder:
+            page = builder.render("# Hi\n\n[a](/a)")
+            self.assertEqual(
+                '<title>Hi</title><div><h1>Hi</h1><p><a href="/base/a">a</a></p></div>',
+                page,
+            )
+            self.assertEqual(
+                '<div><p><a href="/base/a">a</a></p></div>',
+                builder.render_content("[a](/a)"),
+            )
+            self.assertGreater(builder.cache.stats()["hits"], 0)
+
+    def test_render_many_in_order(self):
+        documents = [f"# Page {i}" for i in range(5)]
+        with self.builder() as serial, self.builder(jobs=2) as parallel:
+            expected = list(serial.render_many(documents))
+            self.assertEqual(expected, list(parallel.render_many(documents)))
+            self.assertEqual(expected, list(parallel.render_many(documents)))
+        self.assertIn("<title>Page 3</title>", expected[3])
+
+    def test_template_change_is_picked_up(self):
+        with self.builder(jobs=2) as builder:
+            list(builder.render_many(["# A", "# B"]))
+            self.write(self.template, "<h2>{{ Title }}</h2>")
+            os.utime(self.template, ns=(1, 1))
+            self.assertEqual("<h2>A</h2>", builder.render("# A"))
+            self.assertEqual(["<h2>A</h2>"], list(builder.render_many(["# A"])))
+
+    def test_render_files(self):
+        path = os.path.join(self.content, "index.md")
+        with self.builder() as builder:
+            [(name, page)] = builder.render_files([path])
+        self.assertEqual(path, name)
+        self.assertIn("<title>Home</title>", page)
+
+    def test_build(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for incremental in [False, True]:
+                self.builder().build(incremental)
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "style.css")))
+        with open(os.path.join(self.dst, "index.html")) as f:
+            self.assertIn('<a href="/base/a">a</a>', f.read())
+
+    def test_site_index_cache_survives_full_builds(self):
+        for scanned in ["0 cached, 1 scanned", "1 cached, 0 scanned"]:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.builder(site_index=True).build()
+            self.assertIn(f"Site index: 1 pages, {scanned}", out.getvalue())
+
+    def test_explain(self):
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n![s](/style.css) [gone](/gone)",
+        )
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.builder().build(incremental=True, explain=True)
+        self.assertIn(f"Rebuilding {self.dst}/index.html: new page", out.getvalue())
+        self.assertIn(
+            f"Broken reference in {self.dst}/index.html: /gone", out.getvalue()
+        )
+
+        self.write(os.path.join(self.static, "style.css"), "body { margin: 0 }")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.builder().build(incremental=True, explain=True)
+        self.assertIn(
+            f"Static file /style.css copied: referenced by {self.dst}/index.html",
+            out.getvalue(),
+        )
+        self.assertIn(f"Skipping {self.dst}/index.html: up to date", out.getvalue())
+
+    def test_explain_counts_template_references(self):
+        self.write(self.template, '<link href="/style.css" />{{ Content }}')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.builder().build(incremental=True)
+
+        self.write(os.path.join(self.static, "style.css"), "body { margin: 1px }")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.builder().build(incremental=True, explain=True)
+        self.assertIn(
+            f"Static file /style.css copied: referenced by {self.dst}/index.html",
+            out.getvalue(),
+        )
+
+    def test_fingerprint(self):
+        self.write(self.template, '<link href="/style.css" />{{ Content }}')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        self.write(os.path.join(self.content, "other.md"), "# Other")
+        self.write(os.path.join(self.static, "a.png"), "png")
+        index = os.path.join(self.dst, "index.html")
+
+        def build(**options):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                with self.builder(fingerprint=True, **options) as builder:
+                    builder.build(incremental=True)
+            with open(index) as f:
+                return out.getvalue(), f.read()
+
+        log, page = build()
+        self.assertEqual(2, log.count("Generating page"))
+        first_css = fingerprinted_url(self.dst, "/style.css")
+        first_png = fingerprinted_url(self.dst, "/a.png")
+        self.assertIn(f'href="/base{first_css}"', page)
+        self.assertIn(f'src="/base{first_png}"', page)
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "style.css")))
+
+        log, again = build(jobs=2)
+        self.assertEqual(0, log.count("Generating page"))
+        self.assertEqual(first_css, fingerprinted_url(self.dst, "/style.css"))
+
+        self.write(os.path.join(self.static, "a.png"), "png 2")
+        log, page = build()
+        self.assertEqual(1, log.count("Generating page"))
+        png = fingerprinted_url(self.dst, "/a.png")
+        self.assertNotEqual(first_png, png)
+        self.assertIn(f'src="/base{png}"', page)
+        self.assertFalse(os.path.exists(self.dst + first_png))
+        with open(self.dst + png) as f:
+            self.assertEqual("png 2", f.read())
+
+
+def fingerprinted_url(dest_dir, url):
+    with open(os.path.join(dest_dir, ASSET_MANIFEST_NAME)) as f:
+        return json.load(f)[url]
+
+
+if __name__ == "__main__":
+    unittest.main()
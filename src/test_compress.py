@@ -0,0 +1,67 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import COMPRESS_MANIFEST_NAME, compress_tree
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = self.tmp.name
+        os.makedirs(os.path.join(self.dest, "blog"))
+        self.write("index.html", "<p>home</p>" * 100)
+        self.write("blog/index.html", "<p>blog</p>" * 100)
+        self.write("index.css", "body { margin: 0; }\n" * 50)
+        self.write("photo.png", "not text")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.dest, rel_path), "w") as f:
+            f.write(text)
+
+    def path(self, rel_path):
+        return os.path.join(self.dest, rel_path)
+
+    def test_writes_gzip_siblings_of_text_files(self):
+        for jobs in [1, 2]:
+            stats = compress_tree(self.dest, jobs)
+            self.assertEqual({".css", ".html"}, set(stats.types))
+            for rel_path in ["index.html", "blog/index.html", "index.css"]:
+                with open(self.path(rel_path), "rb") as f:
+                    data = f.read()
+                with gzip.open(self.path(rel_path + ".gz"), "rb") as f:
+                    self.assertEqual(data, f.read())
+            self.assertFalse(os.path.exists(self.path("photo.png.gz")))
+            self.assertFalse(os.path.exists(self.path(COMPRESS_MANIFEST_NAME + ".gz")))
+
+    def test_skips_unchanged_files(self):
+        stats = compress_tree(self.dest)
+        self.assertEqual(2, stats.types[".html"].files)
+        self.assertLess(stats.types[".html"].ratio(".gz"), 0.5)
+
+        os.utime(self.path("index.html.gz"), ns=(1, 1))
+        self.write("blog/index.html", "<p>changed</p>")
+        stats = compress_tree(self.dest)
+        self.assertEqual(1, stats.types[".html"].files)
+        self.assertEqual(1, stats.types[".html"].skipped)
+        self.assertEqual(1, stats.types[".css"].skipped)
+        self.assertEqual(1, os.stat(self.path("index.html.gz")).st_mtime_ns)
+        with gzip.open(self.path("blog/index.html.gz"), "rb") as f:
+            self.assertEqual(b"<p>changed</p>", f.read())
+        self.assertIn(".html", stats.report())
+
+    def test_removes_siblings_of_removed_files(self):
+        compress_tree(self.dest)
+        os.remove(self.path("blog/index.html"))
+        stats = compress_tree(self.dest)
+        self.assertEqual(1, stats.removed)
+        self.assertFalse(os.path.exists(self.path("blog/index.html.gz")))
+        self.assertTrue(os.path.exists(self.path("index.html.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
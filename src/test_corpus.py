@@ -0,0 +1,32 @@
+import unittest
+
+from bench.corpus import CorpusConfig, generate_corpus, parse_block_mix
+from to_html import markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        config = CorpusConfig(pages=3, blocks_per_page=10, seed=7)
+        self.assertListEqual(generate_corpus(config), generate_corpus(config))
+
+        other = generate_corpus(CorpusConfig(pages=3, blocks_per_page=10, seed=8))
+        self.assertNotEqual(generate_corpus(config), other)
+
+    def test_corpus_pages_render(self):
+        config = CorpusConfig(
+            pages=5, blocks_per_page=30, link_density=0.2, image_density=0.1
+        )
+        for page in generate_corpus(config):
+            html = markdown_to_html_node(page).to_html()
+            self.assertTrue(html.startswith("<div><h1>Page "))
+
+    def test_parse_block_mix(self):
+        self.assertDictEqual(
+            {"paragraph": 3, "code": 1}, parse_block_mix("paragraph=3,code=1")
+        )
+        with self.assertRaises(ValueError):
+            parse_block_mix("table=1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from extract_title import extract_title
+from extract_title import extract_html_title, extract_title
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -8,3 +8,9 @@ class TestExtractTitle(unittest.TestCase):
         md = "# Starting with a title\n\n## Subtitle right here\n\n"
         res = extract_title(md)
         self.assertEqual(res, "Starting with a title")
+
+    def test_extract_html_title(self):
+        html = '<p>intro</p>\n<h1 class="big">\n  Contact  </h1><h1>Other</h1>'
+        self.assertEqual(extract_html_title(html), "Contact")
+        with self.assertRaises(Exception):
+            extract_html_title("<h2>No title</h2>")
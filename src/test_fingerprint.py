@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from fingerprint import AssetMap, fingerprinted_name, scan_assets
+from template import compile_template
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprinted_name(self):
+        self.assertEqual(
+            os.path.join("images", "a.0123456789abcdef.png"),
+            fingerprinted_name(os.path.join("images", "a.png"), "0123456789abcdef00"),
+        )
+
+    def test_rewrite(self):
+        assets = AssetMap({"/a.css": "/a.1234.css"})
+        self.assertEqual("/a.1234.css", assets.rewrite("/a.css"))
+        self.assertEqual("/a.1234.css?v=1#x", assets.rewrite("/a.css?v=1#x"))
+        self.assertEqual("/b.css", assets.rewrite("/b.css"))
+        self.assertEqual({"/a.css": "/a.1234.css"}, assets.subset(["/a.css", "/"]))
+
+    def test_template_is_rewritten_with_basepath(self):
+        assets = AssetMap({"/a.css": "/a.1234.css"})
+        template = compile_template(
+            '<link href="/a.css" /><a href="/">home</a>{{ Content }}', "/base/", assets
+        )
+        self.assertEqual(
+            '<link href="/base/a.1234.css" /><a href="/base/">home</a>x',
+            template.render({"Content": "x"}),
+        )
+
+    def test_names_depend_on_contents_only(self):
+        with tempfile.TemporaryDirectory() as root:
+            for name in ["one", "two"]:
+                os.makedirs(os.path.join(root, name, "images"))
+                with open(os.path.join(root, name, "images", "a.png"), "w") as f:
+                    f.write("png")
+                with open(os.path.join(root, name, "robots.txt"), "w") as f:
+                    f.write(name)
+            one = scan_assets(os.path.join(root, "one"))
+            two = scan_assets(os.path.join(root, "two"))
+        self.assertEqual(one.urls, two.urls)
+        self.assertEqual(one.digest, two.digest)
+        self.assertEqual(["/images/a.png"], list(one.urls))
+
+
+if __name__ == "__main__":
+    unittest.main()
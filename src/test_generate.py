@@ -0,0 +1,346 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from generate import generate_pages_recursive, render_page, scan_site
+from manifest import Manifest
+from search import SearchIndex
+from template import compile_template
+
+
+class TestGenerate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.dst = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.dst)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, template_hash="tmpl"):
+        manifest = Manifest.load(self.manifest_path, "gen", template_hash)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive(
+                "/", self.content, self.template, self.dst, manifest
+            )
+        manifest.save()
+        return out.getvalue()
+
+    def test_render_page_rebases_urls(self):
+        template = compile_template('<link href="/a.css" />{{ Content }}', "/base/")
+        md = "# Title\n\n[home](/) ![img](/images/x.png) [ext](https://example.com)"
+        res = render_page("/base/", md, template)
+        self.assertIn('<link href="/base/a.css" />', res)
+        self.assertIn('<a href="/base/">home</a>', res)
+        self.assertIn('<img src="/base/images/x.png" alt="img">', res)
+        self.assertIn('<a href="https://example.com">ext</a>', res)
+
+    def test_profiled_generate_page_splits_io_from_rendering(self):
+        import profiler
+
+        from generate import generate_page
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nsome **text**")
+        dest = os.path.join(self.dst, "index.html")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_page(
+                "/", os.path.join(self.content, "index.md"), self.template, dest
+            )
+            with open(dest) as f:
+                expected = f.read()
+            os.remove(dest)
+            prof = profiler.enable()
+            try:
+                generate_page(
+                    "/", os.path.join(self.content, "index.md"), self.template, dest
+                )
+            finally:
+                profiler.disable()
+        with open(dest) as f:
+            self.assertEqual(expected, f.read())
+        for name in ["template", "read", "serialize", "write"]:
+            self.assertEqual(1, prof.stages[name][0])
+        # parsing is driven by serialization but reported apart from it
+        self.assertIn("parse_blocks", prof.stages)
+        self.assertIn("serialize: HTML serialization", prof.report())
+
+    def test_front_matter_fills_placeholders(self):
+        from generate import generate_page
+
+        source = os.path.join(self.content, "index.md")
+        self.write(source, "---\nauthor: Tolkien\nTitle: ignored\n---\n# Home\n")
+        text = "<title>{{ Title }}</title>by {{ author }}"
+        self.write(self.template, text)
+        expected = "<title>Home</title>by Tolkien"
+        with open(source) as f:
+            self.assertEqual(
+                expected, render_page("/", f.read(), compile_template(text))
+            )
+        dest = os.path.join(self.dst, "index.html")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page("/", source, self.template, dest)
+        with open(dest) as f:
+            self.assertEqual(expected, f.read())
+
+    def test_parallel_matches_serial(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive("/", self.content, self.template, self.dst)
+        serial = {}
+        for name in ["index.html", "blog/index.html"]:
+            with open(os.path.join(self.dst, name)) as f:
+                serial[name] = f.read()
+
+        parallel_dst = os.path.join(self.tmp.name, "parallel")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive(
+                "/", self.content, self.template, parallel_dst, jobs=2
+            )
+        for name, text in serial.items():
+            with open(os.path.join(parallel_dst, name)) as f:
+                self.assertEqual(text, f.read())
+
+    def test_pipelined_matches_serial(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive("/", self.content, self.template, self.dst)
+        for jobs in [1, 2]:
+            dst = os.path.join(self.tmp.name, f"pipelined{jobs}")
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                generate_pages_recursive(
+                    "/", self.content, self.template, dst, jobs=jobs, io_threads=2
+                )
+            self.assertIn("utilisation", out.getvalue())
+            for name in ["index.html", "blog/index.html"]:
+                with open(os.path.join(self.dst, name)) as f:
+                    expected = f.read()
+                with open(os.path.join(dst, name)) as f:
+                    self.assertEqual(expected, f.read())
+
+    def test_identical_outputs_are_left_untouched(self):
+        index = os.path.join(self.dst, "index.html")
+        blog = os.path.join(self.dst, "blog", "index.html")
+        for options in [{}, {"jobs": 2}, {"io_threads": 2}]:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                generate_pages_recursive(
+                    "/", self.content, self.template, self.dst, **options
+                )
+            os.utime(index, ns=(1, 1))
+            os.utime(blog, ns=(1, 1))
+            self.write(os.path.join(self.content, "blog", "index.md"), "# Blog 2")
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                generate_pages_recursive(
+                    "/", self.content, self.template, self.dst, **options
+                )
+            self.assertIn("Left 1 unchanged pages untouched", out.getvalue())
+            self.assertEqual(1, os.stat(index).st_mtime_ns)
+            self.assertNotEqual(1, os.stat(blog).st_mtime_ns)
+            with open(blog) as f:
+                self.assertIn("Blog 2", f.read())
+            self.assertEqual(["blog", "index.html"], sorted(os.listdir(self.dst)))
+            self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+
+    def test_files_are_handled_by_extension(self):
+        self.write(
+            os.path.join(self.content, "blog", "about.html"),
+            '<h1>About</h1><a href="/blog/">blog</a>',
+        )
+        image = bytes(range(256)) * 4
+        with open(os.path.join(self.content, "blog", "photo.png"), "wb") as f:
+            f.write(image)
+        self.write(os.path.join(self.content, "notes.txt"), "# not markdown")
+        for i, options in enumerate([{}, {"jobs": 2}, {"io_threads": 2}]):
+            dst = os.path.join(self.tmp.name, f"out{i}")
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                generate_pages_recursive(
+                    "/base/", self.content, self.template, dst, **options
+                )
+            with open(os.path.join(dst, "blog", "about.html")) as f:
+                self.assertEqual(
+                    '<title>About</title><h1>About</h1><a href="/base/blog/">blog</a>',
+                    f.read(),
+                )
+            with open(os.path.join(dst, "blog", "photo.png"), "rb") as f:
+                self.assertEqual(image, f.read())
+            with open(os.path.join(dst, "notes.txt")) as f:
+                self.assertEqual("# not markdown", f.read())
+            self.assertEqual(2, out.getvalue().count("Copying file"))
+
+    def test_incremental_copies_ignore_template(self):
+        self.write(os.path.join(self.content, "blog", "photo.png"), "png")
+        log = self.build()
+        self.assertEqual(1, log.count("Copying file"))
+        log = self.build(template_hash="tmpl2")
+        self.assertEqual(0, log.count("Copying file"))
+        self.assertEqual(2, log.count("Generating page"))
+        self.write(os.path.join(self.content, "blog", "photo.png"), "png 2")
+        log = self.build(template_hash="tmpl2")
+        self.assertEqual(1, log.count("Copying file"))
+        os.remove(os.path.join(self.content, "blog", "photo.png"))
+        self.build(template_hash="tmpl2")
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "blog", "photo.png")))
+
+    def test_search_index_follows_incremental_builds(self):
+        self.build()
+        manifest = Manifest.load(self.manifest_path, "gen", "tmpl")
+        search = SearchIndex.load(self.dst, "/")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive(
+                "/", self.content, self.template, self.dst, manifest, search=search
+            )
+        self.assertNotIn("Generating page", out.getvalue())
+        self.assertEqual({"/", "/blog/"}, set(search.pages))
+
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive(
+                "/", self.content, self.template, self.dst, manifest, search=search
+            )
+        self.assertEqual({"/"}, set(search.pages))
+
+    def test_search_index_follows_sources_the_manifest_has_seen(self):
+        def index(manifest):
+            search = SearchIndex.load(self.dst, "/")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(
+                    "/", self.content, self.template, self.dst, manifest, search=search
+                )
+            return search, search.save()
+
+        index(None)
+        # a build without the search index renders the edited page
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Hobbits")
+        self.build()
+        manifest = Manifest.load(self.manifest_path, "gen", "tmpl")
+        search, _ = index(manifest)
+        self.assertEqual("Hobbits", search.pages["/blog/"]["title"])
+        self.assertIn("hobbits", search.pages["/blog/"]["terms"])
+
+        # full builds do not re-index unchanged sources either
+        _, changed = index(None)
+        self.assertEqual(0, changed)
+
+    def test_sources_are_read_once(self):
+        import builtins
+
+        import generate
+
+        opened = []
+
+        def counting_open(path, *args, **kwargs):
+            opened.append(path)
+            return builtins.open(path, *args, **kwargs)
+
+        for io_threads, manifest_path in [
+            (0, None),
+            (2, None),
+            (0, self.manifest_path),
+        ]:
+            opened.clear()
+            manifest = None
+            if manifest_path is not None:
+                manifest = Manifest.load(manifest_path, "gen", "tmpl")
+            generate.open = counting_open
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages_recursive(
+                        "/",
+                        self.content,
+                        self.template,
+                        self.dst,
+                        manifest,
+                        io_threads=io_threads,
+                        search=SearchIndex(self.dst, "/"),
+                    )
+            finally:
+                del generate.open
+            sources = [path for path in opened if path.startswith(self.content)]
+            self.assertEqual(sorted(set(sources)), sorted(sources))
+            self.assertEqual(2, len(sources))
+
+    def test_front_matter_and_site_index(self):
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "---\ndate: 2024-01-02\n---\n# Blog\n\ntext",
+        )
+        self.write(os.path.join(self.content, "about.html"), "<h1>About</h1>")
+        site = scan_site("/base/", self.content, self.dst)
+        self.assertEqual(
+            [
+                ["about.html", "/base/about.html", "About", {}],
+                ["blog/index.md", "/base/blog/", "Blog", {"date": "2024-01-02"}],
+                ["index.md", "/base/", "Home", {}],
+            ],
+            sorted([p["path"], p["url"], p["title"], p["metadata"]] for p in site),
+        )
+        for options in [{}, {"jobs": 2}]:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                generate_pages_recursive(
+                    "/", self.content, self.template, self.dst, **options
+                )
+            with open(os.path.join(self.dst, "blog", "index.html")) as f:
+                self.assertEqual(
+                    "<title>Blog</title><div><h1>Blog</h1><p>text</p></div>", f.read()
+                )
+
+    def test_parallel_error_names_source(self):
+        self.write(os.path.join(self.content, "blog", "index.md"), "no title")
+        out = io.StringIO()
+        with self.assertRaisesRegex(Exception, "blog/index.md"):
+            with contextlib.redirect_stdout(out):
+                generate_pages_recursive(
+                    "/", self.content, self.template, self.dst, jobs=2
+                )
+
+    def test_incremental_skips_unchanged_pages(self):
+        log = self.build()
+        self.assertEqual(2, log.count("Generating page"))
+
+        log = self.build()
+        self.assertEqual(0, log.count("Generating page"))
+
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog 2")
+        log = self.build()
+        self.assertEqual(1, log.count("Generating page"))
+        self.assertIn("blog/index.md", log)
+
+        log = self.build(template_hash="tmpl2")
+        self.assertEqual(2, log.count("Generating page"))
+
+    def test_incremental_removes_vanished_pages(self):
+        self.build()
+        blog_out = os.path.join(self.dst, "blog", "index.html")
+        self.assertTrue(os.path.exists(blog_out))
+
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(blog_out))
+        self.assertFalse(os.path.exists(os.path.dirname(blog_out)))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
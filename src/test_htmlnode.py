@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -63,3 +64,49 @@ class TestHTMLNode(unittest.TestCase):
             parent_node.to_html(),
             "<div><span><b>grandchild</b></span></div>",
         )
+
+    def test_write_html_streams_chunks(self):
+        deep = LeafNode("b", "leaf")
+        for _ in range(5000):
+            deep = ParentNode("span", [deep])
+        root = ParentNode("div", [LeafNode(None, "text"), deep], {"class": "x"})
+
+        chunks = list(root.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), root.to_html())
+
+        fp = io.StringIO()
+        root.write_html(fp)
+        self.assertEqual(fp.getvalue(), root.to_html())
+        self.assertTrue(fp.getvalue().startswith('<div class="x">text<span>'))
+
+    def test_iter_html_invalid_parent(self):
+        parent_node = ParentNode("div", [ParentNode(None, [])])
+        with self.assertRaises(ValueError):
+            parent_node.to_html()
+
+    def test_nodes_have_no_instance_dict(self):
+        for nd in [HTMLNode(), LeafNode("p", "v"), ParentNode("div", [])]:
+            self.assertFalse(hasattr(nd, "__dict__"))
+        self.assertIs(LeafNode("h" + "1", "a").tag, LeafNode("h1", "b").tag)
+
+    def test_props_values_are_escaped(self):
+        nd = LeafNode("a", "x", {"href": '/a?b=1&c="2"', "title": "<it's>"})
+        self.assertEqual(
+            '<a href="/a?b=1&amp;c=&quot;2&quot;" title="&lt;it\'s&gt;">x</a>',
+            nd.to_html(),
+        )
+
+    def test_props_cache_is_invalidated_on_mutation(self):
+        nd = LeafNode("img", "", {"src": "/a.png"})
+        self.assertEqual('src="/a.png"', nd.props_to_html())
+        nd.props["src"] = "/b.png"
+        self.assertEqual('src="/b.png"', nd.props_to_html())
+        nd.props.update(alt="b")
+        self.assertEqual('src="/b.png" alt="b"', nd.props_to_html())
+        del nd.props["src"]
+        self.assertEqual('alt="b"', nd.props_to_html())
+        nd.props = {"class": "c"}
+        self.assertEqual('<img class="c"></img>', nd.to_html())
+        nd.props = None
+        self.assertEqual("<img></img>", nd.to_html())
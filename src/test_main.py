@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import main
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestMain(unittest.TestCase):
+    def test_import_loads_no_generator_modules(self):
+        code = "import sys, main; print(' '.join(sorted(sys.modules)))"
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        for module in ["generate", "builder", "to_html", "template", "argparse"]:
+            self.assertNotIn(module, out)
+
+    def test_version(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertEqual(0, main.main(["--version"]))
+        self.assertEqual(f"static site generator {main.VERSION}\n", out.getvalue())
+
+    def test_block_cache_path_rejects_parallel_builds(self):
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err), self.assertRaises(SystemExit):
+            main.parse_args(["--block-cache-path", "blocks.db", "-j", "2"])
+        self.assertIn("--block-cache-path needs a serial build", err.getvalue())
+        args = main.parse_args(["--block-cache-path", "blocks.db"])
+        self.assertEqual("blocks.db", args.block_cache_path)
+
+    def test_check(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                err = io.StringIO()
+                with contextlib.redirect_stderr(err):
+                    self.assertEqual(1, main.main(["--check"]))
+                self.assertIn("content directory", err.getvalue())
+                self.assertIn("template at", err.getvalue())
+
+                for name in ["content", "static", "docs"]:
+                    os.mkdir(name)
+                with open("template.html", "w") as f:
+                    f.write("<title>{{ Title }}</title>")
+                err = io.StringIO()
+                with contextlib.redirect_stderr(err):
+                    self.assertEqual(1, main.main(["--check"]))
+                self.assertEqual(
+                    "template has no {{ Content }} placeholder\n", err.getvalue()
+                )
+
+                with open("template.html", "w") as f:
+                    f.write("<title>{{ Title }}</title>{{ Content }}")
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    self.assertEqual(0, main.main(["--check"]))
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from manifest import Manifest, hash_bytes
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "manifest.json")
+        self.dest = os.path.join(self.tmp.name, "index.html")
+        with open(self.dest, "w") as f:
+            f.write("<p>page</p>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_after_reload(self):
+        manifest = Manifest(self.path, "gen", "tmpl")
+        source_hash = hash_bytes(b"# page")
+        self.assertFalse(manifest.is_fresh(self.dest, source_hash, "/"))
+        manifest.record(self.dest, "index.md", source_hash, "/")
+        manifest.save()
+
+        manifest = Manifest.load(self.path, "gen", "tmpl")
+        self.assertTrue(manifest.is_fresh(self.dest, source_hash, "/"))
+        self.assertFalse(manifest.is_fresh(self.dest, hash_bytes(b"# edit"), "/"))
+        self.assertFalse(manifest.is_fresh(self.dest, source_hash, "/base/"))
+
+    def test_template_or_generator_change_invalidates(self):
+        manifest = Manifest(self.path, "gen", "tmpl")
+        source_hash = hash_bytes(b"# page")
+        manifest.record(self.dest, "index.md", source_hash, "/")
+        manifest.save()
+
+        for generator, template in [("gen2", "tmpl"), ("gen", "tmpl2")]:
+            manifest = Manifest.load(self.path, generator, template)
+            self.assertFalse(manifest.is_fresh(self.dest, source_hash, "/"))
+
+    def test_why_stale(self):
+        manifest = Manifest(self.path, "gen", "tmpl")
+        self.assertEqual("new page", manifest.why_stale(self.dest, "a", "/"))
+        manifest.record(self.dest, "index.md", "a", "/", ["/images/a.png"])
+        manifest.save()
+
+        cases = [
+            ("gen", "tmpl", "a", "/", None),
+            ("gen", "tmpl", "b", "/", "source changed"),
+            ("gen", "tmpl2", "a", "/", "template changed"),
+            ("gen2", "tmpl", "a", "/", "generator changed"),
+            ("gen", "tmpl", "a", "/base/", "basepath changed"),
+        ]
+        for generator, template, source_hash, basepath, reason in cases:
+            manifest = Manifest.load(self.path, generator, template)
+            self.assertEqual(
+                reason, manifest.why_stale(self.dest, source_hash, basepath)
+            )
+        os.remove(self.dest)
+        self.assertEqual("output missing", manifest.why_stale(self.dest, "a", "/"))
+
+    def test_referenced_by(self):
+        manifest = Manifest(self.path, "gen", "tmpl")
+        manifest.record("a.html", "a.md", "a", "/", ["/images/x.png", "/b"])
+        manifest.record("b.html", "b.md", "b", "/", ["/images/x.png"])
+        manifest.save()
+        manifest = Manifest.load(self.path, "gen", "tmpl")
+        self.assertEqual(["a.html", "b.html"], manifest.referenced_by("/images/x.png"))
+        self.assertEqual(["a.html"], manifest.referenced_by("/b"))
+        self.assertEqual([], manifest.referenced_by("/c"))
+
+    def test_stale_outputs(self):
+        manifest = Manifest(self.path, "gen", "tmpl")
+        manifest.record(self.dest, "index.md", "a", "/")
+        manifest.record("gone.html", "gone.md", "b", "/")
+        manifest.save()
+
+        manifest = Manifest.load(self.path, "gen", "tmpl")
+        manifest.is_fresh(self.dest, "a", "/")
+        self.assertListEqual(["gone.html"], manifest.stale_outputs())
+
+    def test_missing_output_is_not_fresh(self):
+        manifest = Manifest(self.path, "gen", "tmpl")
+        manifest.record(self.dest, "index.md", "a", "/")
+        os.remove(self.dest)
+        self.assertFalse(manifest.is_fresh(self.dest, "a", "/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
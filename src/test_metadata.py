@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from metadata import (
+    MetadataCache,
+    markdown_header,
+    read_front_matter,
+    read_header,
+    strip_front_matter,
+)
+
+
+class TestMetadata(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def test_markdown_header(self):
+        text = "---\ndate: 2024-01-02\ntags: a, b\n---\n# Title\n\nbody"
+        self.assertEqual(
+            ("Title", {"date": "2024-01-02", "tags": "a, b"}), markdown_header(text)
+        )
+        self.assertEqual(("Title", {}), markdown_header("# Title\n\nbody"))
+        with self.assertRaises(Exception):
+            markdown_header("---\ndate: 2024\n# Title")
+
+    def test_front_matter_is_not_content(self):
+        text = "---\ndate: 2024\n---\n# Title\n\nbody"
+        self.assertEqual("# Title\n\nbody", strip_front_matter(text))
+        self.assertEqual("# Title\n\nbody", strip_front_matter("# Title\n\nbody"))
+        self.write(text)
+        with open(self.path) as f:
+            self.assertEqual(({"date": "2024"}, "# Title\n"), read_front_matter(f))
+            self.assertEqual("\n", f.readline())
+
+    def test_read_header_is_bounded(self):
+        self.write("# Title\n\n" + "body line\n" * 1000)
+        seen = []
+
+        def parse(text):
+            seen.append(len(text))
+            return markdown_header(text)
+
+        self.assertEqual(("Title", {}), read_header(self.path, parse, limit=64))
+        self.assertLessEqual(seen[0], 64)
+
+        # a header that does not fit in the bound is read in full
+        self.write("---\n" + "k: v\n" * 100 + "---\n# Long\n\nbody")
+        seen.clear()
+        self.assertEqual("Long", read_header(self.path, parse, limit=64)[0])
+        self.assertEqual(2, len(seen))
+
+    def test_cache_is_keyed_on_mtime_and_size(self):
+        self.write("# One")
+        cache_path = os.path.join(self.tmp.name, "cache.json")
+        cache = MetadataCache.load(cache_path)
+        self.assertEqual("One", cache.header(self.path, markdown_header)[0])
+        cache.save()
+
+        cache = MetadataCache.load(cache_path)
+        self.assertEqual("One", cache.header(self.path, markdown_header)[0])
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+
+        self.write("# Two!")
+        self.assertEqual("Two!", cache.header(self.path, markdown_header)[0])
+        self.assertEqual(1, cache.misses)
+        cache.retain([])
+        self.assertEqual({}, cache.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import threading
+import unittest
+
+from pipeline import run_pipeline
+
+
+def render_upper(inputs, stats):
+    for item, data in inputs:
+        stats.stage("render").add(0.0)
+        yield item, data.upper()
+
+
+class TestPipeline(unittest.TestCase):
+    def test_renders_in_order_and_writes_everything(self):
+        written = {}
+        lock = threading.Lock()
+
+        def write(item, output):
+            with lock:
+                written[item] = output
+            return len(output)
+
+        items = [str(i) for i in range(50)]
+        rendered, stats = run_pipeline(
+            items,
+            read=lambda item: f"page {item}",
+            render=render_upper,
+            write=write,
+            readers=3,
+            writers=3,
+            depth=4,
+        )
+        self.assertEqual([(item, len(f"PAGE {item}")) for item in items], rendered)
+        self.assertEqual({item: f"PAGE {item}" for item in items}, written)
+        self.assertEqual(50, stats.stage("read").items)
+        self.assertEqual(50, stats.stage("write").items)
+        self.assertLessEqual(stats.queue("read").max, 4)
+        self.assertLessEqual(stats.queue("write").max, 4)
+
+    def test_reads_are_bounded_by_depth(self):
+        reads = []
+
+        def render(inputs, stats):
+            for item, data in inputs:
+                # nothing beyond the next depth items has been read yet
+                self.assertLessEqual(len(reads), int(item) + 1 + 2)
+                yield item, data
+
+        run_pipeline(
+            [str(i) for i in range(10)],
+            read=lambda item: reads.append(item) or item,
+            render=render,
+            write=lambda item, output: None,
+            readers=2,
+            writers=1,
+            depth=2,
+        )
+        self.assertEqual(10, len(reads))
+
+    def test_read_error_is_raised(self):
+        def read(item):
+            if item == "bad":
+                raise Exception("cannot read bad")
+            return item
+
+        with self.assertRaisesRegex(Exception, "cannot read bad"):
+            run_pipeline(["a", "bad", "c"], read, render_upper, lambda i, o: None)
+
+    def test_write_error_is_raised(self):
+        def write(item, output):
+            raise Exception(f"cannot write {item}")
+
+        with self.assertRaisesRegex(Exception, "cannot write"):
+            run_pipeline(["a", "b"], lambda item: item, render_upper, write)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+from to_html import markdown_to_html_node
+
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_disabled_spans_are_shared(self):
+        self.assertFalse(profiler.is_enabled())
+        self.assertIs(profiler.stage("a"), profiler.stage("b"))
+        self.assertIs(profiler.stage("a"), profiler.page("p"))
+
+    def test_stages_and_pages(self):
+        prof = profiler.enable()
+        with profiler.page("index.md"):
+            markdown_to_html_node("# title\n\nsome **bold** text\n\n- a\n- b")
+
+        calls, total, self_time = prof.stages["parse_blocks"]
+        self.assertGreaterEqual(calls, 3)
+        self.assertLess(self_time, total)
+        self.assertEqual(4, prof.stages["parse_inline"][0])
+        self.assertListEqual(["index.md"], [p for p, _ in prof.slowest_pages()])
+        self.assertIn("parse_inline", prof.report())
+
+    def test_write_trace(self):
+        prof = profiler.enable()
+        with profiler.stage("build"):
+            with profiler.stage("read"):
+                pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            prof.write_trace(path)
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+        self.assertListEqual(["read", "build"], [e["name"] for e in events])
+        self.assertTrue(all(e["ph"] == "X" for e in events))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from references import find_html_references, find_references, reference_target
+
+
+class TestReferences(unittest.TestCase):
+    def test_find_references(self):
+        markdown = """# Title
+
+![img](/images/a.png) and [page](/blog/tom/#top) and [ext](https://x.com)
+
+```
+[not a reference](/code)
+```
+
+- [again](/images/a.png) [proto](//cdn.example.com/x.js) [q](/search?q=1)"""
+        self.assertEqual(
+            ["/images/a.png", "/blog/tom/", "/search"], find_references(markdown)
+        )
+
+    def test_find_html_references(self):
+        html = (
+            '<a href="/blog/#top">b</a><img src="/a.png" alt="a">'
+            '<a href="https://x.com">x</a><script src="//cdn.example.com/x.js">'
+            '</script><a href="/blog/">again</a>'
+        )
+        self.assertEqual(["/blog/", "/a.png"], find_html_references(html))
+
+    def test_reference_target(self):
+        with tempfile.TemporaryDirectory() as dest:
+            os.makedirs(os.path.join(dest, "blog"))
+            for name in ["blog/index.html", "a.png"]:
+                with open(os.path.join(dest, name), "w") as f:
+                    f.write("")
+            self.assertEqual(
+                os.path.join(dest, "blog", "index.html"),
+                reference_target("/blog/", dest),
+            )
+            self.assertEqual(
+                os.path.join(dest, "a.png"), reference_target("/a.png", dest)
+            )
+            self.assertIsNone(reference_target("/missing", dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
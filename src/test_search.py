@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+
+from search import (
+    HEADING_WEIGHT,
+    SEARCH_DIR_NAME,
+    SearchIndex,
+    html_document,
+    markdown_document,
+    page_url,
+)
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def chunk(self, prefix):
+        with open(os.path.join(self.dest, SEARCH_DIR_NAME, f"{prefix}.json")) as f:
+            return json.load(f)
+
+    def test_markdown_document(self):
+        markdown = """# Tolkien Index
+
+Tolkien wrote **books**, see [the shire](/shire) and ![a hobbit](/h.png).
+
+```
+code_is_skipped
+```
+
+- first item
+- _second_ item"""
+        title, terms = markdown_document(markdown)
+        self.assertEqual("Tolkien Index", title)
+        self.assertEqual(HEADING_WEIGHT + 1, terms["tolkien"])
+        self.assertEqual(1, terms["shire"])
+        self.assertEqual(1, terms["hobbit"])
+        self.assertEqual(2, terms["item"])
+        self.assertNotIn("h", terms)
+        self.assertNotIn("png", terms)
+        self.assertNotIn("code_is_skipped", terms)
+        self.assertNotIn("code", terms)
+
+    def test_html_document(self):
+        title, terms = html_document('<h1 class="x">Contact</h1><p>Contact us</p>')
+        self.assertEqual("Contact", title)
+        self.assertEqual({"contact": HEADING_WEIGHT + 1, "us": 1}, terms)
+
+    def test_page_url(self):
+        dest = os.path.join("docs")
+        for path, url in [
+            ("docs/index.html", "/base/"),
+            ("docs/blog/tom/index.html", "/base/blog/tom/"),
+            ("docs/about.html", "/base/about.html"),
+        ]:
+            self.assertEqual(url, page_url(path, dest, "/base/"))
+
+    def test_incremental_update(self):
+        index = SearchIndex.load(self.dest, "/")
+        index.update("/a/", "A", {"tolkien": 2, "hobbit": 1})
+        index.update("/b/", "B", {"tolkien": 1, "elf": 4})
+        self.assertEqual(3, index.save())
+        self.assertEqual({"tolkien": [0, 2, 1, 1]}, self.chunk("to"))
+
+        index = SearchIndex.load(self.dest, "/")
+        self.assertTrue(index.has("/a/"))
+        self.assertIsNone(index.source_hash("/a/"))
+        index.update("/a/", "A", {"tolkien": 2, "hobbit": 1}, "abc")
+        self.assertEqual("abc", index.source_hash("/a/"))
+        index.update("/b/", "B", {"elf": 5})
+        index.retain(["/b/"])
+        # the 'ho' chunk is emptied, the 'to' and 'el' chunks change
+        self.assertEqual(3, index.save())
+        self.assertEqual({"elf": [1, 5]}, self.chunk("el"))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest, SEARCH_DIR_NAME, "to.json"))
+        )
+        with open(os.path.join(self.dest, SEARCH_DIR_NAME, "pages.json")) as f:
+            listing = json.load(f)
+        self.assertEqual({"1": ["/b/", "B"]}, listing["pages"])
+        self.assertEqual(["el"], listing["chunks"])
+
+        index = SearchIndex.load(self.dest, "/")
+        index.update("/b/", "B", {"elf": 5})
+        self.assertEqual(0, index.save())
+
+    def test_basepath_change_rebuilds(self):
+        index = SearchIndex.load(self.dest, "/")
+        index.update("/a/", "A", {"tolkien": 1})
+        index.save()
+        index = SearchIndex.load(self.dest, "/base/")
+        self.assertFalse(index.has("/a/"))
+        index.update("/base/a/", "A", {"elf": 1})
+        index.save()
+        self.assertEqual(
+            ["el.json", "pages.json"],
+            sorted(os.listdir(os.path.join(self.dest, SEARCH_DIR_NAME))),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from builder import Builder
+from shard import parse_shard, shard_of, verify_shards
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dst = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(self.static)
+        os.makedirs(self.dst)
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        with open(os.path.join(self.static, "style.css"), "w") as f:
+            f.write("body {}")
+        self.pages = [f"page{i}/index.md" for i in range(12)] + ["index.md"]
+        for page in self.pages:
+            path = os.path.join(self.content, page)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"# {page}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def builder(self):
+        return Builder(self.content, self.static, self.template, self.dst)
+
+    def build_shards(self, count):
+        dirs = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index in range(1, count + 1):
+                out_dir = os.path.join(self.tmp.name, f"shard{index}")
+                dirs.append(self.builder().build_shard((index, count), out_dir))
+        return dirs
+
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), parse_shard("2/4"))
+        for text in ["0/4", "5/4", "1/0", "x", "1/2/3"]:
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_shards_partition_pages(self):
+        for count in [1, 3, 5]:
+            shards = [shard_of(page, count) for page in self.pages]
+            self.assertTrue(all(1 <= shard <= count for shard in shards))
+            self.assertEqual(shards, [shard_of(page, count) for page in self.pages])
+        self.assertGreater(len({shard_of(page, 3) for page in self.pages}), 1)
+
+    def test_merge_matches_full_build(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.builder().build()
+        expected = {}
+        for dir_path, _, names in os.walk(self.dst):
+            for name in names:
+                path = os.path.join(dir_path, name)
+                with open(path) as f:
+                    expected[os.path.relpath(path, self.dst)] = f.read()
+
+        dirs = self.build_shards(3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.builder().merge(dirs)
+        for rel_path, text in expected.items():
+            with open(os.path.join(self.dst, rel_path)) as f:
+                self.assertEqual(text, f.read())
+
+    def test_merge_detects_missing_and_colliding_pages(self):
+        dirs = self.build_shards(3)
+        expected = [page.replace(".md", ".html") for page in self.pages]
+
+        with self.assertRaisesRegex(Exception, "shards missing"):
+            verify_shards(dirs[:2], expected)
+
+        shard1 = os.listdir(dirs[0])
+        page = next(name for name in shard1 if name.startswith("page"))
+        shutil.copytree(os.path.join(dirs[0], page), os.path.join(dirs[1], page))
+        with self.assertRaisesRegex(Exception, f"unexpected file {page}"):
+            verify_shards(dirs, expected)
+
+        shutil.rmtree(os.path.join(dirs[1], page))
+        with self.assertRaisesRegex(Exception, "no shard produced extra/index.html"):
+            verify_shards(dirs, expected + ["extra/index.html"])
+        without_page = [p for p in expected if not p.startswith(page + "/")]
+        with self.assertRaisesRegex(Exception, "which has no source"):
+            verify_shards(dirs, without_page)
+
+        self.assertEqual(sorted(expected), sorted(verify_shards(dirs, expected)))
+
+    def test_merge_rejects_shards_of_other_options(self):
+        dirs = self.build_shards(2)
+        marker = os.path.join(self.dst, "marker")
+        with open(marker, "w") as f:
+            f.write("kept")
+
+        merging = Builder(self.content, self.static, self.template, self.dst, "/b/")
+        with self.assertRaisesRegex(Exception, "built with basepath '/', the merge"):
+            merging.merge(dirs)
+        merging = Builder(
+            self.content, self.static, self.template, self.dst, fingerprint=True
+        )
+        with self.assertRaisesRegex(Exception, "built with assets None"):
+            merging.merge(dirs)
+        # verification failed before dest_dir was replaced
+        self.assertTrue(os.path.exists(marker))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from sync import sync_tree
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.src, "images"))
+        os.makedirs(self.dst)
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_copies_then_skips(self):
+        stats = sync_tree(self.src, self.dst)
+        self.assertEqual(2, stats.copied)
+        self.assertEqual(10, stats.bytes_copied)
+        self.assertEqual("png", self.read(os.path.join(self.dst, "images", "a.png")))
+
+        stats = sync_tree(self.src, self.dst)
+        self.assertEqual(0, stats.copied)
+        self.assertEqual(2, stats.skipped)
+
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        stats = sync_tree(self.src, self.dst)
+        self.assertEqual(1, stats.copied)
+        self.assertEqual(
+            "body { margin: 0 }", self.read(os.path.join(self.dst, "index.css"))
+        )
+
+    def test_checksum_skips_touched_files(self):
+        sync_tree(self.src, self.dst)
+        os.utime(os.path.join(self.src, "index.css"), (0, 0))
+        stats = sync_tree(self.src, self.dst, checksum=True)
+        self.assertEqual(0, stats.copied)
+        stats = sync_tree(self.src, self.dst)
+        self.assertEqual(1, stats.copied)
+
+    def test_removes_stale_files_only(self):
+        sync_tree(self.src, self.dst)
+        page = os.path.join(self.dst, "index.html")
+        self.write(page, "<p>page</p>")
+
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        stats = sync_tree(self.src, self.dst)
+        self.assertEqual(1, stats.removed)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_link_methods(self):
+        for method in ["hardlink", "reflink"]:
+            dst = os.path.join(self.tmp.name, method)
+            os.makedirs(dst)
+            stats = sync_tree(self.src, dst, method=method)
+            self.assertEqual(2, stats.copied)
+            self.assertEqual("body {}", self.read(os.path.join(dst, "index.css")))
+
+            stats = sync_tree(self.src, dst, method=method)
+            self.assertEqual(2, stats.skipped)
+
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.src, "index.css"),
+                os.path.join(self.tmp.name, "hardlink", "index.css"),
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
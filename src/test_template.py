@@ -0,0 +1,45 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import compile_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_placeholders(self):
+        template = compile_template("<title>{{ Title }}</title>{{Content}}")
+        self.assertListEqual(["Title", "Content"], template.placeholders())
+        res = template.render({"Title": "my page", "Content": "<p>hi</p>"})
+        self.assertEqual(res, "<title>my page</title><p>hi</p>")
+
+    def test_render_arbitrary_placeholders(self):
+        template = compile_template("{{ Author }} wrote {{ Title }} ({{ Author }})")
+        res = template.render({"Author": "JRR", "Title": "LOTR"})
+        self.assertEqual(res, "JRR wrote LOTR (JRR)")
+
+    def test_render_missing_value(self):
+        template = compile_template("<p>{{ Missing }}</p>")
+        with self.assertRaises(Exception):
+            template.render({})
+
+    def test_values_are_not_rebased(self):
+        template = compile_template(
+            '<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/base/"
+        )
+        res = template.render({"Content": '<a href="/raw">'})
+        self.assertEqual(
+            res,
+            '<link href="/base/index.css" /><img src="/base/a.png" /><a href="/raw">',
+        )
+
+    def test_write_streams_node_values(self):
+        template = compile_template("<title>{{ Title }}</title>{{ Content }}")
+        values = {"Title": "t", "Content": ParentNode("p", [LeafNode("b", "x")])}
+        fp = io.StringIO()
+        template.write(fp, values)
+        self.assertEqual(fp.getvalue(), "<title>t</title><p><b>x</b></p>")
+        self.assertEqual(template.render(values), fp.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
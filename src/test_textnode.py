@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from textnode import (
@@ -6,6 +7,8 @@ from textnode import (
     split_nodes_delimiter,
     extract_markdown_images,
     extract_markdown_links,
+    iter_image_spans,
+    iter_link_spans,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
@@ -58,6 +61,10 @@ class TestTextNode(unittest.TestCase):
 
         self.assertNotEqual(node1, node2)
 
+    def test_no_instance_dict(self):
+        node, _ = getEqualNodes()
+        self.assertFalse(hasattr(node, "__dict__"))
+
     # TODO: finish test
     def test_split_nodes(self):
         text_node_simple = TextNode("text", TextType.TEXT)
@@ -229,6 +236,31 @@ class TestTextNode(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_adjacent_links(self):
+        node = TextNode("[a](/a)[b](/b) and [a](/a)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.LINK, "/a"),
+                TextNode("b", TextType.LINK, "/b"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "/a"),
+            ],
+            split_nodes_link([node]),
+        )
+        node = TextNode("no links here", TextType.TEXT)
+        self.assertListEqual([node], split_nodes_link([node]))
+
+    def test_spans(self):
+        text = "see ![img](/i.png) and [a](/a), [a](/a)"
+        self.assertListEqual([(4, 18, "img", "/i.png")], list(iter_image_spans(text)))
+        spans = list(iter_link_spans(text))
+        self.assertListEqual(
+            [(5, 18, "img", "/i.png"), (23, 30, "a", "/a"), (32, 39, "a", "/a")],
+            spans,
+        )
+        for start, end, anchor, url in spans:
+            self.assertEqual(f"[{anchor}]({url})", text[start:end])
+
     def test_text_to_textnodes(self):
         input = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
         res = text_to_textnodes(input)
@@ -250,6 +282,99 @@ class TestTextNode(unittest.TestCase):
             res,
         )
 
+    def test_text_to_textnodes_adjacent_elements(self):
+        input = "[a_b](/c_d) and ![img](/i.png)[link](/l) **bold** and `co_de`"
+        res = text_to_textnodes(input)
+        self.assertListEqual(
+            [
+                TextNode("a_b", TextType.LINK, "/c_d"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("img", TextType.IMAGE, "/i.png"),
+                TextNode("link", TextType.LINK, "/l"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("bold", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("co_de", TextType.CODE),
+            ],
+            res,
+        )
+
+        res = text_to_textnodes("[ ![img](/i.png) ]")
+        self.assertListEqual(
+            [
+                TextNode("[ ", TextType.TEXT),
+                TextNode("img", TextType.IMAGE, "/i.png"),
+                TextNode(" ]", TextType.TEXT),
+            ],
+            res,
+        )
+
+        self.assertListEqual([TextNode("", TextType.TEXT)], text_to_textnodes(""))
+
+    def test_text_to_textnodes_doubled_delimiters(self):
+        self.assertListEqual(
+            [TextNode("snake_case", TextType.CODE)], text_to_textnodes("``snake_case``")
+        )
+        self.assertListEqual(
+            [
+                TextNode("strong", TextType.ITALIC),
+                TextNode(" text", TextType.TEXT),
+            ],
+            text_to_textnodes("__strong__ text"),
+        )
+
+    def test_text_to_textnodes_literal_delimiters(self):
+        self.assertListEqual(
+            [
+                TextNode("**a**", TextType.ITALIC),
+                TextNode(" ", TextType.TEXT),
+                TextNode("_b_ **c**", TextType.CODE),
+            ],
+            text_to_textnodes("_**a**_ `_b_ **c**`"),
+        )
+        # a trailing '***' closes bold and leaves a bold '*', as splitting on
+        # '**' with split_nodes_delimiter() does
+        for text in ["**a** ***", "x ***_i_"]:
+            nodes = [TextNode(text, TextType.TEXT)]
+            for delimiter, text_type in [
+                ("`", TextType.CODE),
+                ("_", TextType.ITALIC),
+                ("**", TextType.BOLD),
+            ]:
+                nodes = split_nodes_delimiter(nodes, delimiter, text_type)
+            self.assertListEqual(nodes, text_to_textnodes(text))
+        self.assertEqual(TextNode("*", TextType.BOLD), text_to_textnodes("x ***")[-1])
+
+    def scan_time(self, text):
+        best = None
+        for _ in range(5):
+            start = time.perf_counter()
+            try:
+                text_to_textnodes(text)
+            except Exception:
+                pass
+            list(iter_link_spans(text))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def test_unclosed_elements_are_linear(self):
+        self.assertEqual(
+            [TextNode("x ![a](b " * 10, TextType.TEXT)],
+            text_to_textnodes("x ![a](b " * 10),
+        )
+        # four times the input takes about four times as long to scan when the
+        # scan is linear and sixteen times when it is quadratic
+        for unit in ["x ![a](b ", "[a](", "[", "![a](", "a_b **"]:
+            small = self.scan_time(unit * 2000)
+            large = self.scan_time(unit * 8000)
+            self.assertLess(large, 8 * small, unit)
+
+    def test_text_to_textnodes_invalid(self):
+        for input in ["unclosed **bold", "snake_case", "a `code", "``"]:
+            with self.assertRaises(Exception):
+                text_to_textnodes(input)
+
 
 if __name__ == "__main__":
     unittest.main()
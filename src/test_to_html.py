@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from to_html import markdown_to_html_node
+from to_html import markdown_lines_to_html_node, markdown_to_html_node
 
 
 class TestToHTML(unittest.TestCase):
@@ -92,3 +93,9 @@ the **same** even with inline stuff
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
+
+    def test_markdown_lines_to_html_node(self):
+        md = "# Title\n\nsome **bold** text\n\n- a\n- b\n\n```\ncode\n```\n"
+        expected = markdown_to_html_node(md).to_html()
+        node = markdown_lines_to_html_node(io.StringIO(md))
+        self.assertEqual(expected, node.to_html())
@@ -0,0 +1,136 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+from watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    Rebuilder,
+    ReloadState,
+    serve,
+)
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dst = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        os.makedirs(self.dst)
+        self.write(self.template, "<body>{{ Content }}</body>")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def rebuilder(self):
+        return Rebuilder("/", self.content, self.static, self.template, self.dst)
+
+    def test_polling_watcher(self):
+        watcher = PollingWatcher([self.content], [self.template], interval=0.01)
+        self.assertSetEqual(set(), watcher.wait(0))
+
+        page = os.path.join(self.content, "blog", "index.md")
+        self.write(page, "# Blog, edited")
+        self.write(self.template, "<main>{{ Content }}</main>")
+        self.assertSetEqual({page, self.template}, watcher.wait(1))
+
+        os.remove(page)
+        self.assertSetEqual({page}, watcher.wait(1))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.content], [self.template])
+        except OSError:
+            self.skipTest("inotify is not available")
+        try:
+            new_dir = os.path.join(self.content, "new")
+            os.makedirs(new_dir)
+            self.assertSetEqual(set(), watcher.wait(0.5))
+
+            page = os.path.join(new_dir, "index.md")
+            self.write(page, "# New")
+            self.assertIn(page, watcher.wait(1))
+
+            self.write(os.path.join(self.tmp.name, "other.txt"), "ignored")
+            self.write(self.template, "<main>{{ Content }}</main>")
+            self.assertSetEqual({self.template}, watcher.wait(1))
+        finally:
+            watcher.close()
+
+    def test_rebuild_only_changed_pages(self):
+        rebuilder = self.rebuilder()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rebuilder.full_build()
+
+        page = os.path.join(self.content, "blog", "index.md")
+        self.write(page, "# Blog, edited")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            rebuilder.rebuild({page})
+        self.assertEqual(1, out.getvalue().count("Generating page"))
+        self.assertIn(
+            "Blog, edited", self.read(os.path.join(self.dst, "blog", "index.html"))
+        )
+
+        self.write(self.template, "<main>{{ Content }}</main>")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            rebuilder.rebuild({self.template})
+        self.assertEqual(2, out.getvalue().count("Generating page"))
+
+    def test_rebuild_removes_deleted_pages(self):
+        rebuilder = self.rebuilder()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rebuilder.full_build()
+            blog_dir = os.path.join(self.content, "blog")
+            os.remove(os.path.join(blog_dir, "index.md"))
+            os.rmdir(blog_dir)
+            rebuilder.rebuild({blog_dir})
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.html")))
+
+    def test_serve_injects_live_reload(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.rebuilder().full_build()
+        state = ReloadState()
+        server = serve(self.dst, 0, state, quiet=True)
+        try:
+            url = f"http://localhost:{server.server_address[1]}"
+            with urllib.request.urlopen(url + "/") as res:
+                html = res.read().decode()
+            self.assertIn("__livereload", html)
+            self.assertTrue(html.endswith("</script></body>"))
+
+            with urllib.request.urlopen(url + "/index.css") as res:
+                self.assertEqual(b"body {}", res.read())
+
+            threading.Timer(0.1, state.bump).start()
+            with urllib.request.urlopen(url + "/__livereload?v=0") as res:
+                self.assertEqual(b"1", res.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
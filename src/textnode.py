@@ -12,6 +12,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type: TextType, url=None):
         self.text = text
         self.text_type = text_type
@@ -67,22 +69,40 @@ def split_node_delimiter(old_node, delimiter, text_type):
     return res
 
 
-def extract_markdown_images(text):
-    regex = r"\!\[(.*?)\]\((.*?)\)"
-    return extract_with_double_catch_regex(text, regex)
+# IMAGE_REGEX and LINK_REGEX match a single image or link. LINK_REGEX also
+# matches the bracketed part of an image, so images are split off first. The
+# text of an element may not contain brackets and its URL may not contain
+# parentheses (nor either a line break): every repetition stops at the next
+# delimiter, so a failed match never rescans the text behind it and matching
+# stays linear on unclosed image or link syntax.
+IMAGE_REGEX = re.compile(r"!\[([^\[\]\n]*)\]\(([^()\n]*)\)")
+LINK_REGEX = re.compile(r"\[([^\[\]\n]*)\]\(([^()\n]*)\)")
+# INLINE_LINK_REGEX matches an image (with the '!') or a link.
+INLINE_LINK_REGEX = re.compile(r"(!?)\[([^\[\]\n]*)\]\(([^()\n]*)\)")
 
 
-def extract_markdown_links(text):
-    regex = r"\[(.*?)\]\((.*?)\)"
-    return extract_with_double_catch_regex(text, regex)
+# iter_image_spans() and iter_link_spans() yield a (start, end, text, url)
+# tuple for every image or link in text, where text[start:end] is the whole
+# markdown element and text is an image's alt text.
+def iter_image_spans(text):
+    return iter_spans(text, IMAGE_REGEX)
 
 
-def extract_with_double_catch_regex(text, regex):
-    matches = re.findall(regex, text)
-    res = []
-    for match in matches:
-        res.append((match[0], match[1]))
-    return res
+def iter_link_spans(text):
+    return iter_spans(text, LINK_REGEX)
+
+
+def iter_spans(text, regex):
+    for match in regex.finditer(text):
+        yield match.start(), match.end(), match[1], match[2]
+
+
+def extract_markdown_images(text):
+    return [(alt, url) for _, _, alt, url in iter_image_spans(text)]
+
+
+def extract_markdown_links(text):
+    return [(anchor, url) for _, _, anchor, url in iter_link_spans(text)]
 
 
 def split_nodes_image(old_nodes):
@@ -90,12 +110,7 @@ def split_nodes_image(old_nodes):
 
 
 def split_node_image(old_node):
-    def delim_func(x):
-        return f"![{x[0]}]({x[1]})"
-
-    return split_node_on_delim(
-        old_node, extract_markdown_images, delim_func, TextType.IMAGE
-    )
+    return split_node_on_spans(old_node, iter_image_spans, TextType.IMAGE)
 
 
 def split_nodes_link(old_nodes):
@@ -103,71 +118,108 @@ def split_nodes_link(old_nodes):
 
 
 def split_node_link(old_node):
-    def delim_func(x):
-        return f"[{x[0]}]({x[1]})"
-
-    return split_node_on_delim(
-        old_node, extract_markdown_links, delim_func, TextType.LINK
-    )
+    return split_node_on_spans(old_node, iter_link_spans, TextType.LINK)
 
 
-# TODO: there must be a cleaner way
-def split_node_on_delim(old_node, extract_func, delim_func, text_type):
-    res = []
+# split_node_on_spans() splits a text node around the elements found by
+# spans_func, slicing the text between consecutive match positions in a single
+# pass. Empty text between adjacent elements is dropped.
+def split_node_on_spans(old_node, spans_func, text_type):
     if old_node.text_type != TextType.TEXT:
         return [old_node]
 
-    matches = extract_func(old_node.text)
-    if len(matches) == 0:
-        return [old_node]
-
     text = old_node.text
-
-    delim = delim_func(matches[0])
-    starts_with_match = text[: len(delim)] == delim
-    first_iteration = True
-
-    for match in matches:
-        delim = delim_func(match)
-        split = text.split(delim, 1)
-
-        img_node = TextNode(match[0], text_type, match[1])
-        if not first_iteration or not starts_with_match:
-            res.append(TextNode(split[0], TextType.TEXT))
-        res.append(img_node)
-
-        first_iteration = False
-        text = split[1]
-
-    if len(text) > 0:
-        res.append(TextNode(text, TextType.TEXT))
-
+    res = []
+    pos = 0
+    for start, end, span_text, url in spans_func(text):
+        if start > pos:
+            res.append(TextNode(text[pos:start], TextType.TEXT))
+        res.append(TextNode(span_text, text_type, url))
+        pos = end
+
+    if pos == 0:
+        return [old_node]
+    if pos < len(text):
+        res.append(TextNode(text[pos:], TextType.TEXT))
     return res
 
 
-def text_to_textnodes(text):
-    original = TextNode(text, TextType.TEXT, "")
-
-    def split_bold(nodes):
-        return split_nodes_delimiter(nodes, "**", TextType.BOLD)
+# INLINE_TOKEN_REGEX matches the tokens of inline markdown: an image or link
+# (as INLINE_LINK_REGEX), or a run of code, italic or bold delimiters. A run
+# of doubled delimiters counts as one, so ``snake_case`` is code.
+INLINE_TOKEN_REGEX = re.compile(
+    r"(!?)\[([^\[\]\n]*)\]\(([^()\n]*)\)|(`+)|(_+)|((?:\*\*)+)"
+)
 
-    def split_italic(nodes):
-        return split_nodes_delimiter(nodes, "_", TextType.ITALIC)
 
-    def split_code(nodes):
-        return split_nodes_delimiter(nodes, "`", TextType.CODE)
-
-    # NOTE: order matters!
-    functions = [
-        split_nodes_image,
-        split_nodes_link,
-        split_code,
-        split_italic,
-        split_bold,
-    ]
+# text_to_textnodes() tokenizes inline markdown in a single left-to-right
+# scan. Images and links take precedence everywhere; between them, code spans
+# are split off first, italic text within the rest and bold text within what
+# is neither, so delimiters inside a code span or italic text are literal.
+# Every span has to be closed within the text between images and links, or
+# the markdown is invalid. The nodes are those the split_nodes_*() functions
+# produce when applied in that order.
+def text_to_textnodes(text):
+    nodes = []
+    pos = 0
+    bold_end = -1
+    code = italic = bold = False
+    for match in INLINE_TOKEN_REGEX.finditer(text):
+        link = match[3] is not None
+        if code and not (link or match[4]) or italic and match[6]:
+            continue
+        start = match.start()
+        if not (code or italic or match[6]) and is_bold_tail(
+            text, pos, start, bold_end
+        ):
+            if not bold:
+                raise Exception("invalid markdown syntax")
+            nodes.append(TextNode("*", TextType.BOLD))
+            pos = start
+            bold = False
+
+        if link:
+            if code or italic or bold:
+                raise Exception("invalid markdown syntax")
+            text_type = TextType.TEXT
+        elif match[4]:
+            if italic or bold:
+                raise Exception("invalid markdown syntax")
+            text_type = TextType.CODE if code else TextType.TEXT
+            code = not code
+        elif match[5]:
+            if bold:
+                raise Exception("invalid markdown syntax")
+            text_type = TextType.ITALIC if italic else TextType.TEXT
+            italic = not italic
+        else:
+            text_type = TextType.BOLD if bold else TextType.TEXT
+            bold = not bold
+            bold_end = match.end()
+
+        if start > pos:
+            nodes.append(TextNode(text[pos:start], text_type))
+        if link:
+            link_type = TextType.IMAGE if match[1] else TextType.LINK
+            nodes.append(TextNode(match[2], link_type, match[3]))
+        pos = match.end()
+
+    if not (code or italic) and is_bold_tail(text, pos, len(text), bold_end):
+        if not bold:
+            raise Exception("invalid markdown syntax")
+        nodes.append(TextNode("*", TextType.BOLD))
+        pos = len(text)
+        bold = False
+    if code or italic or bold:
+        raise Exception("invalid markdown syntax")
+    if pos < len(text) or not nodes:
+        nodes.append(TextNode(text[pos:], TextType.TEXT))
+    return nodes
 
-    nodes = [original]
-    for func in functions:
-        nodes = func(nodes)
 
-    return nodes
+# is_bold_tail() tells whether text[pos:end], the end of a run of text split on
+# bold delimiters, is a single '*' right behind a delimiter. Such a run ends
+# in '**' and split_node_delimiter() takes that as a closing delimiter that
+# leaves the '*' bold.
+def is_bold_tail(text, pos, end, bold_end):
+    return pos == bold_end and end == pos + 1 and text[pos] == "*"
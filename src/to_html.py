@@ -1,44 +1,81 @@
-from blocks import BlockType, block_to_block_type, markdown_to_blocks
-from htmlnode import ParentNode
+from blocks import BlockType, iter_blocks
+from htmlnode import LeafNode, ParentNode, StreamNode
 from node_conversion import text_node_to_html_node
+from profiler import stage
 from textnode import TextNode, TextType, text_to_textnodes
 
 
-def markdown_to_html_node(markdown):
-    children = []
-
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.HEADING:
-                children.append(heading_to_html_node(block))
-            case BlockType.CODE:
-                children.append(code_block_to_html_node(block))
-            case BlockType.QUOTE:
-                children.append(quote_block_to_html_node(block))
-            case BlockType.UNORDERED_LIST:
-                children.append(
-                    list_block_to_html_node(block, BlockType.UNORDERED_LIST)
+def markdown_to_html_node(markdown, transform=None, cache=None, namespace=""):
+    nodes = iter_block_nodes(markdown.split("\n"), transform, cache, namespace)
+    return ParentNode("div", list(nodes))
+
+
+# markdown_lines_to_html_node() returns a node that parses and serializes the
+# markdown read from lines (e.g. an open file) one block at a time, while it is
+# being written. The node can only be serialized once.
+def markdown_lines_to_html_node(lines, transform=None, cache=None, namespace=""):
+    return StreamNode("div", iter_block_nodes(lines, transform, cache, namespace))
+
+
+# iter_block_nodes() yields the HTML node of every block. transform, when
+# given, is applied to each block's node. With a BlockCache, each block's
+# transformed HTML is memoized and returned as a raw leaf node; namespace must
+# then identify the transform (e.g. the basepath links are rebased to).
+def iter_block_nodes(lines, transform=None, cache=None, namespace=""):
+    blocks = iter_blocks(lines)
+    while True:
+        with stage("parse_blocks"):
+            block = next(blocks, None)
+            if block is None:
+                return
+            block_type, block_lines = block
+            if cache is None:
+                node = block_to_html_node(block_type, block_lines)
+                if transform is not None:
+                    node = transform(node)
+            else:
+                node = cached_block_to_html_node(
+                    block_type, block_lines, transform, cache, namespace
                 )
-            case BlockType.ORDERED_LIST:
-                children.append(list_block_to_html_node(block, BlockType.ORDERED_LIST))
-            case BlockType.PARAGRAPH:
-                children.append(paragraph_block_to_html_node(block))
-
-    root = ParentNode("div", children)
-    return root
-
-
-# code_block_to_html_node() takes a code-block text and returns two levels of
+        yield node
+
+
+def cached_block_to_html_node(block_type, lines, transform, cache, namespace):
+    key = cache.key(block_type, lines, namespace)
+    html = cache.get(key)
+    if html is None:
+        node = block_to_html_node(block_type, lines)
+        if transform is not None:
+            node = transform(node)
+        html = node.to_html()
+        cache.put(key, html)
+    return LeafNode(None, html)
+
+
+def block_to_html_node(block_type, lines):
+    match block_type:
+        case BlockType.HEADING:
+            return heading_to_html_node(lines)
+        case BlockType.CODE:
+            return code_block_to_html_node(lines)
+        case BlockType.QUOTE:
+            return quote_block_to_html_node(lines)
+        case BlockType.UNORDERED_LIST:
+            return list_block_to_html_node(lines, BlockType.UNORDERED_LIST)
+        case BlockType.ORDERED_LIST:
+            return list_block_to_html_node(lines, BlockType.ORDERED_LIST)
+        case BlockType.PARAGRAPH:
+            return paragraph_block_to_html_node(lines)
+
+
+# code_block_to_html_node() takes the lines of a code-block and returns two levels of
 # nodes, one parent with a 'pre' tag, and a leaf with the 'code' tag). It does
 # not parse lines into individual TextNodes and instead turns the whole block,
 # with first and last lines removed, into a single TextNode.
-def code_block_to_html_node(block):
+def code_block_to_html_node(lines):
     tag = "pre"
 
-    split = block.split("\n")
-    text = "\n".join(split[1 : len(split) - 1])
+    text = "\n".join(lines[1 : len(lines) - 1])
     text.replace(
         "  ", " "
     )  # replace any double-spaces that were introduced, expecting no issues from replacing actual double-spaces
@@ -52,11 +89,11 @@ def code_block_to_html_node(block):
     return parent
 
 
-# list_block_to_html_node() takes a block and the specific type of list the
+# list_block_to_html_node() takes the lines of a block and the specific type of list the
 # block represents. It returns a parent-node with the appropriate tag ('ul' or
 # 'ol'). The parent-node will contain one child (with 'li' tag) for each item in
 # the list.
-def list_block_to_html_node(block, list_type):
+def list_block_to_html_node(lines, list_type):
     tag = "ul"
     pref = lambda num: "- "
     if list_type == BlockType.ORDERED_LIST:
@@ -64,45 +101,35 @@ def list_block_to_html_node(block, list_type):
         pref = lambda num: f"{num}. "
     children = []
     i = 1
-    for line in block.split("\n"):
+    for line in lines:
         line = line.removeprefix(pref(i))
-        text_nodes = text_to_textnodes(line)
-        children.append(
-            ParentNode(
-                "li", [text_node_to_html_node(text_node) for text_node in text_nodes]
-            )
-        )
+        children.append(ParentNode("li", text_to_children(line)))
         i += 1
     return ParentNode(tag, children)
     pass
 
 
-def paragraph_block_to_html_node(block):
+def paragraph_block_to_html_node(lines):
     tag = "p"
-    text = " ".join([line for line in block.split("\n")])
+    text = " ".join(lines)
     text.replace(
         "  ", " "
     )  # replace any double-spaces that were introduced, expecting no issues from replacing actual double-spaces
-    text_nodes = text_to_textnodes(text)
-    return ParentNode(
-        tag, [text_node_to_html_node(text_node) for text_node in text_nodes]
-    )
+    return ParentNode(tag, text_to_children(text))
 
 
-def quote_block_to_html_node(block):
+def quote_block_to_html_node(lines):
     tag = "blockquote"
     prefix = "> "
-    text = " ".join([line[len(prefix) :] for line in block.split("\n")])
+    text = " ".join([line[len(prefix) :] for line in lines])
     text.replace(
         "  ", " "
     )  # replace any double-spaces that were introduced, expecting no issues from replacing actual double-spaces
-    text_nodes = text_to_textnodes(text)
-    return ParentNode(
-        tag, [text_node_to_html_node(text_node) for text_node in text_nodes]
-    )
+    return ParentNode(tag, text_to_children(text))
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines):
+    block = "\n".join(lines)
     i, old, new = 0, block, block.removeprefix("#")
     while len(old) != len(new):
         i += 1
@@ -111,10 +138,14 @@ def heading_to_html_node(block):
     text = new.removeprefix(" ")
 
     tag = f"h{i}"
-    text_nodes = text_to_textnodes(text)
-    return ParentNode(
-        tag, [text_node_to_html_node(text_node) for text_node in text_nodes]
-    )
+    return ParentNode(tag, text_to_children(text))
+
+
+# text_to_children() parses inline markdown into the HTML nodes of a block.
+def text_to_children(text):
+    with stage("parse_inline"):
+        text_nodes = text_to_textnodes(text)
+        return [text_node_to_html_node(text_node) for text_node in text_nodes]
 
 
 # example HTML with the various tags
@@ -0,0 +1,408 @@
+import argparse
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from block_cache import BlockCache
+from fsutil import remove_empty_dirs
+from generate import (
+    generate_file,
+    generate_pages_recursive,
+    merge_references,
+    page_dest_path,
+    page_handler,
+    page_references,
+    template_references,
+)
+from manifest import MANIFEST_NAME, Manifest, generator_hash, hash_bytes, hash_file
+from sync import sync_tree
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    "<script>(function(){var v=null;function poll(){"
+    f'fetch("{LIVE_RELOAD_PATH}"+(v===null?"":"?v="+v))'
+    ".then(function(r){return r.text()}).then(function(t){"
+    "if(v!==null&&t!==v){location.reload();return}v=t;poll()})"
+    ".catch(function(){setTimeout(poll,1000)})}poll()})();</script>"
+)
+
+
+def is_ignored(path):
+    name = os.path.basename(path)
+    return name.startswith(".") or name.endswith("~") or name.endswith(".swp")
+
+
+# PollingWatcher detects changes by comparing (mtime, size) snapshots of every
+# file under the watched directories, plus the individually watched files.
+class PollingWatcher:
+    def __init__(self, dirs, files, interval=0.2):
+        self.dirs = dirs
+        self.files = files
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        paths = list(self.files)
+        for root in self.dirs:
+            for dir_path, _, file_names in os.walk(root):
+                paths.extend(os.path.join(dir_path, name) for name in file_names)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    # wait() blocks for up to timeout seconds and returns the set of paths that
+    # were created, modified or deleted in the meantime.
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            changed = {path for path in changed if not is_ignored(path)}
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+# InotifyWatcher uses the linux inotify API through libc. Every directory
+# under the watched roots gets a watch, including directories created later.
+# Individually watched files are observed through their parent directory, so
+# that editors that save by renaming a new file into place are still seen.
+class InotifyWatcher:
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_ISDIR = 0x40000000
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+    )
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, dirs, files):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches = {}
+        self.recursive = set()
+        self.files = {os.path.normpath(path) for path in files}
+        for root in dirs:
+            self.add_tree(root)
+        for path in self.files:
+            self.add_watch(os.path.dirname(path) or ".")
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+        self.watches[wd] = path
+        return wd
+
+    def add_tree(self, root):
+        for dir_path, _, _ in os.walk(root):
+            self.recursive.add(self.add_watch(dir_path))
+
+    def wait(self, timeout):
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        data = os.read(self.fd, 1 << 16)
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, pos)
+            pos += self.EVENT_HEADER.size
+            name = data[pos : pos + length].rstrip(b"\0")
+            pos += length
+            dir_path = self.watches.get(wd)
+            if dir_path is None or not name:
+                continue
+            path = os.path.join(dir_path, os.fsdecode(name))
+            if wd not in self.recursive:
+                if os.path.normpath(path) in self.files:
+                    changed.add(path)
+                continue
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self.add_tree(path)
+                    changed.update(walk_files(path))
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    changed.add(path)
+                continue
+            if not is_ignored(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def walk_files(root):
+    for dir_path, _, file_names in os.walk(root):
+        for name in file_names:
+            yield os.path.join(dir_path, name)
+
+
+def make_watcher(dirs, files, poll=False):
+    if not poll:
+        try:
+            return InotifyWatcher(dirs, files)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(dirs, files)
+
+
+# Rebuilder applies a batch of changed input paths to the output directory.
+# A template change rebuilds every page (through the manifest, which sees the
+# new template hash); otherwise only the changed pages are re-rendered, and
+# static files are synced.
+class Rebuilder:
+    def __init__(self, basepath, content_dir, static_dir, template_path, dest_dir):
+        self.basepath = basepath
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.manifest = None
+        # unchanged blocks of edited pages are served from memory
+        self.cache = BlockCache()
+
+    def full_build(self):
+        sync_tree(self.static_dir, self.dest_dir)
+        self.manifest = Manifest.load(
+            os.path.join(self.dest_dir, MANIFEST_NAME),
+            generator_hash(),
+            hash_file(self.template_path),
+        )
+        generate_pages_recursive(
+            self.basepath,
+            self.content_dir,
+            self.template_path,
+            self.dest_dir,
+            self.manifest,
+            cache=self.cache,
+        )
+        self.manifest.save()
+
+    def rebuild(self, changed):
+        paths = {os.path.normpath(path) for path in changed}
+        if os.path.normpath(self.template_path) in paths:
+            self.full_build()
+            return
+        if any(is_under(path, self.static_dir) for path in paths):
+            sync_tree(self.static_dir, self.dest_dir)
+        for path in sorted(paths):
+            if is_under(path, self.content_dir):
+                self.rebuild_page(path)
+        self.manifest.save()
+
+    def rebuild_page(self, from_path):
+        if not os.path.isfile(from_path):
+            self.remove_pages(from_path)
+            return
+        dest_path = page_dest_path(from_path, self.content_dir, self.dest_dir)
+        handler = page_handler(from_path)
+        rendered = handler is not None
+        with open(from_path, "rb") as f:
+            source = f.read()
+        source_hash = hash_bytes(source)
+        if self.manifest.is_fresh(dest_path, source_hash, self.basepath, rendered):
+            return
+        generate_file(
+            self.basepath, from_path, self.template_path, dest_path, self.cache
+        )
+        refs = None
+        if handler is not None:
+            refs = merge_references(
+                page_references(handler, source),
+                template_references(self.template_path),
+            )
+        self.manifest.record(
+            dest_path, from_path, source_hash, self.basepath, refs, rendered
+        )
+
+    # remove_pages() removes the outputs of every page whose source is path or
+    # lies under it, which covers deleted files as well as deleted directories.
+    def remove_pages(self, path):
+        for dest_path, entry in list(self.manifest.entries.items()):
+            if not is_under(os.path.normpath(entry["source"]), path):
+                continue
+            print(f"Removing page {dest_path}")
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), self.dest_dir)
+            self.manifest.forget(dest_path)
+
+
+def is_under(path, root):
+    root = os.path.normpath(root)
+    return path == root or path.startswith(root + os.sep)
+
+
+# ReloadState is the build generation that live-reload clients wait on.
+class ReloadState:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def bump(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+# LiveReloadHandler serves the output directory, injecting the live-reload
+# script into HTML pages. The script long-polls LIVE_RELOAD_PATH, which answers
+# as soon as the build generation differs from the one the page was loaded at.
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    reload_state = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == LIVE_RELOAD_PATH:
+            self.serve_reload(parse_qs(url.query).get("v"))
+            return
+        path = self.translate_path(url.path)
+        if os.path.isdir(path) and url.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self.serve_html(path)
+            return
+        super().do_GET()
+
+    def serve_reload(self, version):
+        if version is None:
+            current = self.reload_state.version
+        else:
+            current = self.reload_state.wait_for_change(int(version[0]), 25)
+        self.send_bytes(str(current).encode(), "text/plain")
+
+    def serve_html(self, path):
+        with open(path, "r") as f:
+            text = f.read()
+        idx = text.rfind("</body>")
+        if idx < 0:
+            idx = len(text)
+        text = text[:idx] + LIVE_RELOAD_SCRIPT + text[idx:]
+        self.send_bytes(text.encode(), "text/html; charset=utf-8")
+
+    def send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(dest_dir, port, reload_state, quiet=False):
+    attrs = {"reload_state": reload_state}
+    if quiet:
+        attrs["log_message"] = lambda self, *args: None
+    handler = type("Handler", (LiveReloadHandler,), attrs)
+    server = ThreadingHTTPServer(
+        ("", port), functools.partial(handler, directory=dest_dir)
+    )
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# watch_loop() waits for changes, lets bursts of writes settle for debounce
+# seconds, and then rebuilds once for the whole batch.
+def watch_loop(watcher, rebuilder, reload_state, debounce=0.05):
+    while True:
+        changed = watcher.wait(1.0)
+        if not changed:
+            continue
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            changed |= more
+        start = time.perf_counter()
+        try:
+            rebuilder.rebuild(changed)
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            continue
+        elapsed = (time.perf_counter() - start) * 1e3
+        print(f"Rebuilt {len(changed)} changed path(s) in {elapsed:.1f} ms")
+        reload_state.bump()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="rebuild the site on change and serve it with live reload"
+    )
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--debounce", type=float, default=0.05)
+    parser.add_argument(
+        "--poll", action="store_true", help="poll for changes instead of inotify"
+    )
+    args = parser.parse_args()
+
+    # assuming function is called from project root
+    content, static, template_path, dst = "content", "static", "template.html", "docs"
+    os.makedirs(dst, exist_ok=True)
+
+    rebuilder = Rebuilder(args.basepath, content, static, template_path, dst)
+    rebuilder.full_build()
+    watcher = make_watcher([content, static], [template_path], args.poll)
+    reload_state = ReloadState()
+    server = serve(dst, args.port, reload_state)
+    print(f"Serving {dst} at http://localhost:{args.port}/ ({type(watcher).__name__})")
+    try:
+        watch_loop(watcher, rebuilder, reload_state, args.debounce)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()